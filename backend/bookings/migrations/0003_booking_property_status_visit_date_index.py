@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'status', 'visit_date'], name='bookings_propert_5231e3_idx'),
+        ),
+    ]
@@ -16,6 +16,9 @@ class Booking(models.Model):
         ('completed', 'Completed'),
     )
     
+    # Statuses that keep the visit date from being booked again
+    BLOCKING_STATUSES = ('pending', 'paid')
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         User,
@@ -55,6 +58,9 @@ class Booking(models.Model):
             models.Index(fields=['property']),
             models.Index(fields=['status']),
             models.Index(fields=['visit_date']),
+            # Per-property date ranges of blocking bookings: availability
+            # calendar and the ?available_from= anti-join
+            models.Index(fields=['property', 'status', 'visit_date']),
         ]
         ordering = ['-created_at']
     
@@ -106,7 +112,7 @@ class Booking(models.Model):
         return self.status in ['pending', 'paid']
     
     def save(self, *args, **kwargs):
-        # Auto-calculate amounts on first save
-        if not self.pk and self.property:
+        # Auto-calculate amounts on first save (the UUID pk is set before insert)
+        if self._state.adding and self.property_id:
             self.calculate_amounts()
         super().save(*args, **kwargs)
\ No newline at end of file
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Booking
-from properties.serializers import PropertyListSerializer
+from properties.serializers import PropertyListSerializer, SparseFieldsetMixin
 from users.serializers import UserSerializer
 
 class BookingCreateSerializer(serializers.ModelSerializer):
@@ -31,7 +31,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         return booking
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     property = PropertyListSerializer(read_only=True)
     user = UserSerializer(read_only=True)
     amounts = serializers.SerializerMethodField()
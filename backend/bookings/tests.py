@@ -196,4 +196,64 @@ class BookingAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         booking.refresh_from_db()
-        self.assertEqual(booking.status, 'canceled')
\ No newline at end of file
+        self.assertEqual(booking.status, 'canceled')
+
+    def test_sparse_fieldset(self):
+        """Test ?fields= and ?expand= on bookings"""
+        self.client.force_authenticate(user=self.user)
+        booking = Booking.objects.create(
+            user=self.user,
+            property=self.property,
+            visit_date=date.today() + timedelta(days=7)
+        )
+
+        response = self.client.get('/api/bookings/', {'fields': 'id,status,property.name'})
+        self.assertEqual(response.data['results'], [
+            {'id': str(booking.id), 'status': 'pending', 'property': {'name': 'Test Villa'}}
+        ])
+
+        response = self.client.get('/api/bookings/', {'fields': 'property,user.email', 'expand': 'user'})
+        self.assertEqual(response.data['results'], [
+            {'property': self.property.id, 'user': {'email': 'test@test.com'}}
+        ])
+
+    def test_values_serialization(self):
+        """Test the values() list path renders the same JSON"""
+        self.client.force_authenticate(user=self.user)
+        Booking.objects.create(
+            user=self.user,
+            property=self.property,
+            visit_date=date.today() + timedelta(days=7),
+            notes='Gate code 1234'
+        )
+
+        for params in ({}, {'fields': 'id,amounts,property.price', 'expand': 'property'}):
+            with self.settings(VALUES_LIST_SERIALIZATION=False):
+                expected = self.client.get('/api/bookings/', params, HTTP_ACCEPT='application/json').content
+            with self.settings(VALUES_LIST_SERIALIZATION=True):
+                actual = self.client.get('/api/bookings/', params, HTTP_ACCEPT='application/json').content
+            self.assertEqual(actual, expected)
+
+    def test_export(self):
+        """Test streaming CSV export for admins"""
+        admin = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='admin123',
+            user_type='admin'
+        )
+        booking = Booking.objects.create(
+            user=self.user,
+            property=self.property,
+            visit_date=date.today() + timedelta(days=7)
+        )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/bookings/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=admin)
+        response = self.client.get('/api/bookings/export/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'property_slug', 'user_email'])
+        self.assertEqual(lines[1].split(',')[:3], [str(booking.id), 'test-villa', 'test@test.com'])
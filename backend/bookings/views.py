@@ -1,19 +1,41 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from properties.export import ExportMixin
+from properties.serializers import SparseFieldset
+from properties.values_serializer import ValuesListMixin
 from .models import Booking
 from .serializers import BookingSerializer, BookingCreateSerializer
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ValuesListMixin, ExportMixin, viewsets.ModelViewSet):
     """Booking management"""
     permission_classes = [permissions.IsAuthenticated]
+    export_name = 'bookings'
+    export_fields = (
+        'id', 'property__slug', 'user__email', 'visit_date', 'visit_time',
+        'base_amount', 'service_fee', 'tax_amount', 'total_amount', 'status',
+        'notes', 'created_at', 'updated_at',
+    )
     
     def get_queryset(self):
         user = self.request.user
+        queryset = self.with_related(Booking.objects.all())
         if user.is_admin_user():
-            return Booking.objects.all()
-        return Booking.objects.filter(user=user)
+            return queryset
+        return queryset.filter(user=user)
+    
+    def with_related(self, queryset):
+        """Join the nested property/user only when they are rendered (see ?fields=)"""
+        fieldset = SparseFieldset.from_request(self.request)
+        if fieldset.wants('property') and fieldset.expands('property'):
+            if fieldset.child('property').wants('category_name'):
+                queryset = queryset.select_related('property__category')
+            else:
+                queryset = queryset.select_related('property')
+        if fieldset.wants('user') and fieldset.expands('user'):
+            queryset = queryset.select_related('user')
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
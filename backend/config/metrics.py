@@ -0,0 +1,126 @@
+"""
+Prometheus metrics
+Request latency by DRF view/action, response status counts, DB query count
+and time, cache hits/misses and payment-provider latency, served at /metrics.
+
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(see gunicorn.conf.py) and /metrics aggregates the files of all workers;
+without that variable the in-process registry is served.
+"""
+
+import os
+import time
+from django.conf import settings
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from .queries import track_queries
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['view', 'action', 'method']
+)
+RESPONSES = Counter(
+    'http_responses_total', 'Responses by status code', ['view', 'action', 'method', 'status']
+)
+DB_QUERIES = Counter(
+    'db_queries_total', 'Database queries run while serving requests', ['view', 'action']
+)
+DB_QUERY_TIME = Counter(
+    'db_query_seconds_total', 'Time spent in database queries while serving requests', ['view', 'action']
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Default cache lookups', ['result']
+)
+PAYMENT_PROVIDER_LATENCY = Histogram(
+    'payment_provider_request_seconds', 'Payment provider call latency',
+    ['provider', 'operation', 'outcome'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+
+def view_labels(request):
+    """(view, action) from the resolved URL; DRF viewsets name their action"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched', ''
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return func.__name__, ''
+    actions = getattr(func, 'actions', None) or {}
+    return view_class.__name__, actions.get(request.method.lower(), '')
+
+
+class MetricsMiddleware:
+    """Observe latency, status and DB work of every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        view, action = view_labels(request)
+        REQUEST_LATENCY.labels(view, action, request.method).observe(elapsed)
+        RESPONSES.labels(view, action, request.method, response.status_code).inc()
+        if stats.count:
+            DB_QUERIES.labels(view, action).inc(stats.count)
+            DB_QUERY_TIME.labels(view, action).inc(stats.duration)
+        return response
+
+
+class MetricsCacheMixin:
+    """Count hits and misses of get()/get_many() on a cache backend"""
+    _missing = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            CACHE_REQUESTS.labels('miss').inc()
+            return default
+        CACHE_REQUESTS.labels('hit').inc()
+        return value
+
+    def get_many(self, keys, version=None):
+        if super().get_many.__func__ is BaseCache.get_many:
+            # The generic implementation calls get() per key, counted there
+            return super().get_many(keys, version)
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        CACHE_REQUESTS.labels('hit').inc(len(found))
+        CACHE_REQUESTS.labels('miss').inc(len(keys) - len(found))
+        return found
+
+
+class LocMemCache(MetricsCacheMixin, BaseLocMemCache):
+    pass
+
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:
+    pass
+else:
+    class RedisCache(MetricsCacheMixin, BaseRedisCache):
+        pass
+
+
+def metrics_view(request):
+    """Prometheus exposition, behind METRICS_TOKEN or else METRICS_ALLOWED_IPS"""
+    if settings.METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {settings.METRICS_TOKEN}':
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,102 @@
+"""
+Per-request query budget and N+1 detection
+QueryBudgetMiddleware wraps every database connection while a request is
+served, counting queries, their time and how often each query shape (SQL
+with literals and IN-lists folded) repeats. Requests over their budget, or
+repeating a shape QUERY_REPEAT_THRESHOLD times, are logged or raised
+according to QUERY_BUDGET_MODE; with DEBUG the numbers go out as headers.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in QUERY_BUDGET_MODE 'raise' (development and tests)"""
+
+
+def query_shape(sql):
+    """SQL with parameters, literals and IN-list lengths folded away"""
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _LITERAL.sub('?', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """connection.execute_wrapper() recording count, time and shapes"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+@contextmanager
+def track_queries():
+    """QueryStats of everything the block runs, on every connection"""
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        yield stats
+
+
+class QueryBudgetMiddleware:
+    """Enforce QUERY_BUDGETS (by URL name, e.g. 'bookings:booking-list')"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == 'off':
+            return self.get_response(request)
+
+        with track_queries() as stats:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        budget = settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+        repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = stats.count
+            response['X-Query-Time'] = f'{stats.duration * 1000:.1f}ms'
+            response['X-Query-Budget'] = budget
+            response['X-Query-Repeats'] = repeated[0][1] if repeated else 0
+
+        if stats.count > budget or repeated:
+            message = (
+                f'{request.method} {request.path} ({view_name}) ran {stats.count} queries '
+                f'in {stats.duration * 1000:.1f}ms, budget {budget}'
+            )
+            for shape, count in repeated:
+                message += f'\n  repeated {count}x: {shape}'
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,147 @@
+"""
+Read-replica routing
+Reads made while serving a safe request (GET/HEAD/OPTIONS) go round-robin to
+the healthy aliases in settings.DATABASE_REPLICAS; writes, unsafe requests,
+transactions, code outside requests, and users who wrote in the last
+REPLICA_PIN_SECONDS use the primary, so everyone reads their own writes.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Routing state of the request being served in this thread/task
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def pin_key(user_id):
+    return f'replica_pin_user_{user_id}'
+
+
+class RequestState:
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.pinned_user = None
+
+    def use_primary(self):
+        if self.wrote or self.request.method not in SAFE_METHODS:
+            return True
+        # DRF authenticates inside the view and sets request.user on the
+        # Django request, so the user is known by the time the view reads
+        user = getattr(self.request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return False
+        if self.pinned_user is None or self.pinned_user[0] != user.pk:
+            self.pinned_user = (user.pk, bool(cache.get(pin_key(user.pk))))
+        return self.pinned_user[1]
+
+
+class ReplicaHealth:
+    """Per-process health of each replica, probed at most every interval.
+
+    A replica that fails its probe is ejected for REPLICA_EJECT_SECONDS and
+    skipped by the round-robin until then.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checked_at = {}
+        self.ejected_until = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        if self.ejected_until.get(alias, 0) > now:
+            return False
+        if now - self.checked_at.get(alias, float('-inf')) < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return True
+        with self.lock:
+            self.checked_at[alias] = now
+        if self.probe(alias):
+            return True
+        logger.warning('Ejecting database replica %s for %ss', alias, settings.REPLICA_EJECT_SECONDS)
+        with self.lock:
+            self.ejected_until[alias] = now + settings.REPLICA_EJECT_SECONDS
+        return False
+
+    def probe(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except DatabaseError:
+            connections[alias].close()
+            return False
+
+    def reset(self):
+        with self.lock:
+            self.checked_at.clear()
+            self.ejected_until.clear()
+
+
+health = ReplicaHealth()
+_turn = itertools.count()
+
+
+class ReplicaRouter:
+    """Primary/replica router, see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        state = _request_state.get()
+        if not replicas or state is None or state.use_primary():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        start = next(_turn)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if health.is_healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """Track each request for ReplicaRouter and pin users who wrote to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState(request)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+        return response
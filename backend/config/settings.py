@@ -33,7 +33,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'config.queries.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -41,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'config.routers.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -73,6 +76,26 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2:5433 (same name and credentials)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, config('DB_REPLICA_HOSTS', default='').split(',')), start=1):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+
+# Seconds a user reads from the primary after writing
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+# Seconds between health probes of a replica, and how long a failed one is skipped
+REPLICA_HEALTH_CHECK_INTERVAL = config('REPLICA_HEALTH_CHECK_INTERVAL', default=5, cast=int)
+REPLICA_EJECT_SECONDS = config('REPLICA_EJECT_SECONDS', default=30, cast=int)
+
 # MongoDB for media/cache (optional)
 MONGODB_SETTINGS = {
     'host': config('MONGODB_HOST', default='localhost'),
@@ -89,7 +112,7 @@ USE_REDIS = config('USE_REDIS', default=False, cast=bool)
 if USE_REDIS:
     CACHES = {
         'default': {
-            'BACKEND': 'django_redis.cache.RedisCache',
+            'BACKEND': 'config.metrics.RedisCache',
             'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
             'OPTIONS': {
                 'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -100,12 +123,38 @@ else:
     # Local memory cache - works without Redis
     CACHES = {
         'default': {
-            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'BACKEND': 'config.metrics.LocMemCache',
             'LOCATION': 'unique-snowflake',
         }
     }
 # ============================================
 
+# Seconds a cached anonymous property list/detail response may be served
+PROPERTY_RESPONSE_CACHE_TIMEOUT = config('PROPERTY_RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds before a worker rebuilds its in-memory similar-properties index
+SIMILARITY_INDEX_TTL = config('SIMILARITY_INDEX_TTL', default=900, cast=int)
+
+# Worker processes rendering responsive image variants (0 renders inline)
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+
+# Bearer token required by /metrics; without one only these client addresses may read it
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1').split(',')
+
+# Query budgets per URL name ('log', 'raise' or 'off'), see config.queries
+QUERY_BUDGET_MODE = config('QUERY_BUDGET_MODE', default='log')
+QUERY_BUDGET_DEFAULT = config('QUERY_BUDGET_DEFAULT', default=30, cast=int)
+QUERY_BUDGETS = {}
+# Identical query shapes per request that count as an N+1
+QUERY_REPEAT_THRESHOLD = config('QUERY_REPEAT_THRESHOLD', default=5, cast=int)
+
+# Paginated lists report the planner's row estimate instead of COUNT(*) from this size
+PAGINATION_ESTIMATE_THRESHOLD = config('PAGINATION_ESTIMATE_THRESHOLD', default=10000, cast=int)
+
+# Render property/booking/payment lists straight from values() rows
+VALUES_LIST_SERIALIZATION = config('VALUES_LIST_SERIALIZATION', default=False, cast=bool)
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -117,7 +166,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'properties.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
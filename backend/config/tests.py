@@ -0,0 +1,335 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APITestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from prometheus_client import REGISTRY
+from unittest.mock import Mock, patch
+from bookings.models import Booking
+from payments.models import Payment
+from payments.strategy import PaymentContext, StripePaymentStrategy
+from properties.models import Category, Property, PropertyImage
+from .queries import QueryBudgetExceeded, QueryBudgetMiddleware, query_shape, track_queries
+from .routers import ReplicaPinningMiddleware, ReplicaRouter, health, pin_key
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Test read-replica routing, ejection and read-your-writes pinning"""
+
+    def setUp(self):
+        # No test transaction here: reads inside one always use the primary
+        cache.clear()
+        health.reset()
+        self.router = ReplicaRouter()
+        self.user = User(pk=1, username='buyer')
+
+    def serve(self, method='get', user=None, view=None):
+        """Run view(request) inside the middleware, return what it returned"""
+        request = getattr(RequestFactory(), method)('/api/properties/')
+        if user is not None:
+            request.user = user
+        result = []
+        ReplicaPinningMiddleware(lambda request: result.append(view()))(request)
+        return result[0]
+
+    def reads(self, count=1):
+        return lambda: [self.router.db_for_read(Property) for _ in range(count)]
+
+    @patch.object(health, 'probe', return_value=True)
+    def test_round_robin_for_safe_requests(self, probe):
+        aliases = self.serve(view=self.reads(4))
+        self.assertEqual(set(aliases), {'replica_1', 'replica_2'})
+        self.assertNotEqual(aliases[0], aliases[1])
+        self.assertEqual(aliases[0], aliases[2])
+
+        self.assertEqual(self.serve('post', view=self.reads()), ['default'])
+        self.assertEqual(self.router.db_for_read(Property), 'default')
+
+    def test_unhealthy_replicas_ejected(self):
+        with patch.object(health, 'probe', side_effect=lambda alias: alias == 'replica_2') as probe, \
+                self.assertLogs('config.routers', 'WARNING') as logs:
+            self.assertEqual(set(self.serve(view=self.reads(4))), {'replica_2'})
+            self.assertEqual(probe.call_count, 2)
+        self.assertIn('Ejecting database replica replica_1', logs.output[0])
+
+        with patch.object(health, 'probe', return_value=True):
+            # replica_1 stays ejected until REPLICA_EJECT_SECONDS pass
+            self.assertEqual(set(self.serve(view=self.reads(4))), {'replica_2'})
+
+        health.reset()
+        with patch.object(health, 'probe', return_value=False), self.assertLogs('config.routers', 'WARNING'):
+            self.assertEqual(self.serve(view=self.reads()), ['default'])
+
+    @patch.object(health, 'probe', return_value=True)
+    def test_writers_pinned_to_primary(self, probe):
+        def write_then_read():
+            self.router.db_for_write(Property)
+            return self.router.db_for_read(Property)
+
+        self.assertEqual(self.serve(user=self.user, view=write_then_read), 'default')
+        self.assertEqual(self.serve(user=self.user, view=self.reads()), ['default'])
+
+        other = User(pk=2, username='other')
+        self.assertIn(self.serve(user=other, view=self.reads())[0], ('replica_1', 'replica_2'))
+
+        cache.delete(pin_key(self.user.pk))
+        self.assertIn(self.serve(user=self.user, view=self.reads())[0], ('replica_1', 'replica_2'))
+
+
+class ReplicaPinningAPITest(APITestCase):
+    """Test API writes pin the authenticated user"""
+
+    def test_booking_pins_user(self):
+        cache.clear()
+        user = User.objects.create_user(username='buyer', email='buyer@test.com', password='test123')
+        prop = Property.objects.create(
+            name='Villa',
+            slug='villa',
+            description='Test',
+            location='Miami',
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+        self.client.force_authenticate(user=user)
+
+        self.client.get('/api/bookings/')
+        self.assertIsNone(cache.get(pin_key(user.pk)))
+
+        response = self.client.post('/api/bookings/', {
+            'property': str(prop.id),
+            'visit_date': (date.today() + timedelta(days=7)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(cache.get(pin_key(user.pk)))
+
+
+class QueryBudgetTest(TestCase):
+    """Test per-request query budgets and repeated query detection"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(6):
+            Property.objects.create(
+                name=f'Villa {i}',
+                slug=f'villa-{i}',
+                description='Test',
+                location='Miami',
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2
+            )
+
+    def serve(self, view):
+        request = RequestFactory().get('/api/properties/')
+        def get_response(request):
+            view()
+            return HttpResponse()
+        return QueryBudgetMiddleware(get_response)(request)
+
+    def n_plus_one(self):
+        for prop in Property.objects.all():
+            Property.objects.filter(pk=prop.pk, bedrooms__gte=prop.bedrooms).exists()
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM "t"  WHERE "id" IN (%s, %s, %s) AND x = 10 AND y = \'a\' LIMIT 21'),
+            'SELECT * FROM "t" WHERE "id" IN (...) AND x = ? AND y = ? LIMIT ?'
+        )
+
+    @override_settings(QUERY_BUDGET_MODE='raise', DEBUG=True)
+    def test_debug_headers(self):
+        response = self.serve(lambda: list(Property.objects.all()))
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertEqual(response['X-Query-Budget'], '30')
+        self.assertEqual(response['X-Query-Repeats'], '0')
+        self.assertTrue(response['X-Query-Time'].endswith('ms'))
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_repeated_shapes_raise(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'repeated 6x: SELECT %s AS "a" FROM "properties"'):
+            self.serve(self.n_plus_one)
+
+    @override_settings(QUERY_BUDGET_MODE='log', QUERY_BUDGETS={'/api/properties/': 2}, QUERY_REPEAT_THRESHOLD=10)
+    def test_budget_logged(self):
+        with self.assertLogs('config.queries', 'WARNING') as logs:
+            self.serve(self.n_plus_one)
+        self.assertIn('GET /api/properties/ (/api/properties/) ran 7 queries', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='raise', QUERY_BUDGETS={'properties:property-list': 1})
+    def test_budget_by_url_name(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '(properties:property-list) ran'):
+            self.client.get('/api/properties/')
+
+
+class MetricsTest(APITestCase):
+    """Test the Prometheus metrics endpoint and instrumentation"""
+
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_metrics(self):
+        labels = {'view': 'PropertyViewSet', 'action': 'list', 'method': 'GET'}
+        count = self.sample('http_request_duration_seconds_count', **labels)
+        ok = self.sample('http_responses_total', status='200', **labels)
+        queries = self.sample('db_queries_total', view='PropertyViewSet', action='list')
+        misses = self.sample('cache_requests_total', result='miss')
+
+        self.client.get('/api/properties/')
+
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), count + 1)
+        self.assertEqual(self.sample('http_responses_total', status='200', **labels), ok + 1)
+        self.assertGreater(self.sample('db_queries_total', view='PropertyViewSet', action='list'), queries)
+        self.assertGreater(self.sample('cache_requests_total', result='miss'), misses)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            b'http_request_duration_seconds_bucket{action="list",le="0.005",method="GET",view="PropertyViewSet"}',
+            response.content
+        )
+
+    def test_cache_hits(self):
+        hits = self.sample('cache_requests_total', result='hit')
+        cache.set('metrics-test', 1)
+        cache.get('metrics-test')
+        cache.get_many(['metrics-test', 'metrics-test-missing'])
+        self.assertEqual(self.sample('cache_requests_total', result='hit'), hits + 2)
+
+    def test_payment_provider_latency(self):
+        labels = {'provider': 'stripe', 'operation': 'get_payment_status'}
+        success = self.sample('payment_provider_request_seconds_count', outcome='success', **labels)
+        error = self.sample('payment_provider_request_seconds_count', outcome='error', **labels)
+        context = PaymentContext(StripePaymentStrategy())
+
+        with patch('stripe.PaymentIntent.retrieve', return_value=Mock(status='succeeded', amount=1000)):
+            context.get_payment_status('pi_123')
+        with patch('stripe.PaymentIntent.retrieve', side_effect=RuntimeError('down')):
+            with self.assertRaises(RuntimeError):
+                context.get_payment_status('pi_123')
+
+        self.assertEqual(self.sample('payment_provider_request_seconds_count', outcome='success', **labels), success + 1)
+        self.assertEqual(self.sample('payment_provider_request_seconds_count', outcome='error', **labels), error + 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+    def test_without_token_only_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=['203.0.113.7']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 200)
+
+
+@override_settings(QUERY_BUDGET_MODE='off')
+class QueryCountScalingTest(APITestCase):
+    """List/detail endpoints must run as many queries for 100 rows as for 1"""
+    SIZES = (1, 10, 100)
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='buyer', email='buyer@test.com', password='test123')
+        self.root = Category.objects.create(name='Residential', slug='residential')
+        self.villas = Category.objects.create(name='Villas', slug='villas', parent=self.root)
+        self.property = self.make_property('villa')
+
+    def make_property(self, slug):
+        return Property.objects.create(
+            name=slug.title(),
+            slug=slug,
+            description='Test',
+            location='Miami',
+            category=self.villas,
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+
+    def make_booking(self, number):
+        booking = Booking(
+            user=self.customer,
+            property=self.make_property(f'villa-{number}'),
+            visit_date=date.today() + timedelta(days=number + 1)
+        )
+        booking.calculate_amounts()
+        booking.save()
+        return booking
+
+    def make_payment(self, number):
+        booking = self.make_booking(number)
+        Payment.objects.create(
+            booking=booking,
+            provider='stripe',
+            transaction_id=f'pi_{number}',
+            amount=booking.total_amount
+        )
+
+    def make_category(self, number):
+        # Alternate depths so rows have ancestors of their own
+        parent = self.villas if number % 2 else self.root
+        Category.objects.create(name=f'Category {number}', slug=f'category-{number}', parent=parent)
+
+    def assertConstantQueries(self, url, make, user=None):
+        """Grow the rendered rows through SIZES with make(n); show SQL that grew with them"""
+        self.client.force_authenticate(user=user)
+        # Once first, so per-process lazy loading is not counted
+        self.client.get(url)
+        runs, made = [], 0
+        for size in self.SIZES:
+            while made < size:
+                make(made)
+                made += 1
+            cache.clear()
+            with track_queries() as stats:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            runs.append((size, stats))
+
+        counts = [stats.count for size, stats in runs]
+        if len(set(counts)) > 1:
+            first, last = runs[0][1], runs[-1][1]
+            lines = [f'{url} ran ' + ', '.join(f'{stats.count} queries for {size} rows' for size, stats in runs)]
+            lines += [
+                f'  {first.shapes[shape]} -> {count}x: {shape}'
+                for shape, count in last.shapes.most_common() if count > first.shapes[shape]
+            ]
+            self.fail('\n'.join(lines))
+
+    def test_property_list(self):
+        self.assertConstantQueries('/api/properties/', lambda n: self.make_property(f'villa-{n}'))
+
+    def test_property_detail(self):
+        self.assertConstantQueries(
+            '/api/properties/villa/',
+            # bulk_create: no variant rendering for files that do not exist
+            lambda n: PropertyImage.objects.bulk_create([
+                PropertyImage(property=self.property, image=f'properties/gallery/{n}.jpg', order=n)
+            ])
+        )
+
+    def test_category_list(self):
+        self.assertConstantQueries('/api/properties/categories/', self.make_category)
+
+    def test_category_children(self):
+        self.assertConstantQueries('/api/properties/categories/residential/children/', self.make_category)
+
+    def test_booking_list(self):
+        self.assertConstantQueries('/api/bookings/', self.make_booking, user=self.customer)
+
+    def test_payment_list(self):
+        self.assertConstantQueries('/api/payments/', self.make_payment, user=self.customer)
+
+    def test_booking_history(self):
+        self.assertConstantQueries('/api/users/bookings/', self.make_booking, user=self.customer)
+
+    def test_payment_history(self):
+        self.assertConstantQueries('/api/users/payments/', self.make_payment, user=self.customer)
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py
+Workers share Prometheus metrics through files in PROMETHEUS_MULTIPROC_DIR,
+which /metrics aggregates (see config/metrics.py).
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+wsgi_app = 'config.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+# Set before any worker imports prometheus_client
+metrics_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'luxury-real-estate-metrics')
+)
+
+
+def on_starting(server):
+    # Samples of a previous run would be added to this one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
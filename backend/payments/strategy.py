@@ -7,8 +7,10 @@ from abc import ABC, abstractmethod
 import stripe
 import requests
 from django.conf import settings
+from config.metrics import PAYMENT_PROVIDER_LATENCY
 from decimal import Decimal
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +41,7 @@ class PaymentStrategy(ABC):
 
 class StripePaymentStrategy(PaymentStrategy):
     """Stripe Payment Implementation"""
+    name = 'stripe'
     
     def __init__(self):
         stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -136,6 +139,7 @@ class StripePaymentStrategy(PaymentStrategy):
 
 class BkashPaymentStrategy(PaymentStrategy):
     """bKash Payment Implementation"""
+    name = 'bkash'
     
     def __init__(self):
         self.app_key = settings.BKASH_APP_KEY
@@ -314,16 +318,30 @@ class PaymentContext:
         self._strategy = strategy
     
     def create_payment(self, booking, **kwargs):
-        return self._strategy.create_payment(booking, **kwargs)
+        return self._timed('create_payment', booking, **kwargs)
     
     def confirm_payment(self, payment_id, **kwargs):
-        return self._strategy.confirm_payment(payment_id, **kwargs)
+        return self._timed('confirm_payment', payment_id, **kwargs)
     
     def refund_payment(self, payment_id, amount=None):
-        return self._strategy.refund_payment(payment_id, amount)
+        return self._timed('refund_payment', payment_id, amount)
     
     def get_payment_status(self, transaction_id):
-        return self._strategy.get_payment_status(transaction_id)
+        return self._timed('get_payment_status', transaction_id)
+    
+    def _timed(self, operation, *args, **kwargs):
+        """Call the strategy, recording provider latency by outcome"""
+        provider = getattr(self._strategy, 'name', type(self._strategy).__name__)
+        outcome = 'error'
+        started = time.perf_counter()
+        try:
+            result = getattr(self._strategy, operation)(*args, **kwargs)
+            outcome = 'success' if result.get('success') else 'failure'
+            return result
+        finally:
+            PAYMENT_PROVIDER_LATENCY.labels(provider, operation, outcome).observe(
+                time.perf_counter() - started
+            )
 
 
 def get_payment_strategy(provider):
@@ -4,6 +4,7 @@ from rest_framework.test import APITestCase
 from decimal import Decimal
 from datetime import date, timedelta
 from unittest.mock import patch, Mock
+import json
 from .models import Payment
 from .strategy import StripePaymentStrategy, BkashPaymentStrategy, PaymentContext
 from bookings.models import Booking
@@ -138,4 +139,70 @@ class PaymentModelTest(TestCase):
 
         self.assertEqual(payment.provider, 'stripe')
         self.assertEqual(payment.status, 'pending')
-        self.assertEqual(payment.booking, self.booking)
\ No newline at end of file
+        self.assertEqual(payment.booking, self.booking)
+
+
+class PaymentAPITest(APITestCase):
+    """Test Payment API endpoints"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='test123'
+        )
+
+        self.property = Property.objects.create(
+            name='Test Villa',
+            slug='test-villa',
+            description='Test',
+            location='Miami',
+            price=Decimal('1000.00'),
+            bedrooms=4,
+            bathrooms=3
+        )
+
+        self.booking = Booking.objects.create(
+            user=self.user,
+            property=self.property,
+            visit_date=date.today() + timedelta(days=7)
+        )
+
+        Payment.objects.create(
+            booking=self.booking,
+            provider='stripe',
+            transaction_id='test_123',
+            amount=self.booking.total_amount,
+            raw_response={'id': 'pi_123', 'amount': 115000},
+            metadata={'source': 'test'}
+        )
+
+    def test_values_serialization(self):
+        """Test the values() list path renders the same JSON"""
+        self.client.force_authenticate(user=self.user)
+
+        with self.settings(VALUES_LIST_SERIALIZATION=False):
+            expected = self.client.get('/api/payments/', HTTP_ACCEPT='application/json')
+        with self.settings(VALUES_LIST_SERIALIZATION=True):
+            actual = self.client.get('/api/payments/', HTTP_ACCEPT='application/json')
+
+        self.assertEqual(expected.status_code, 200)
+        self.assertEqual(len(expected.data['results']), 1)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_export(self):
+        """Test streaming NDJSON export for admins"""
+        admin = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='admin123',
+            user_type='admin'
+        )
+        self.client.force_authenticate(user=admin)
+
+        response = self.client.get('/api/payments/export/', {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['booking'], str(self.booking.id))
+        self.assertEqual(rows[0]['booking_user_email'], 'test@test.com')
+        self.assertEqual(rows[0]['transaction_id'], 'test_123')
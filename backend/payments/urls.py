@@ -13,10 +13,11 @@ router.register(r'', PaymentViewSet, basename='payment')
 
 app_name = 'payments'
 
+# Before the router, whose detail route would otherwise match 'create/' and 'webhooks/...'
 urlpatterns = [
-    path('', include(router.urls)),
     path('create/', CreatePaymentView.as_view(), name='create-payment'),
     path('<uuid:payment_id>/confirm/', ConfirmPaymentView.as_view(), name='confirm-payment'),
     path('webhooks/stripe/', stripe_webhook, name='stripe-webhook'),
     path('webhooks/bkash/', bkash_callback, name='bkash-callback'),
+    path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
+from properties.export import ExportMixin
+from properties.values_serializer import ValuesListMixin
 from .models import Payment
 from .serializers import PaymentSerializer, PaymentCreateSerializer
 from .strategy import PaymentContext, get_payment_strategy
@@ -15,17 +17,23 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
+class PaymentViewSet(ValuesListMixin, ExportMixin, viewsets.ReadOnlyModelViewSet):
     """Payment view (read-only)"""
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_name = 'payments'
+    export_fields = (
+        'id', 'booking', 'booking__user__email', 'provider', 'transaction_id',
+        'amount', 'currency', 'status', 'created_at', 'updated_at',
+    )
     
     def get_queryset(self):
         user = self.request.user
+        queryset = Payment.objects.select_related('booking__property__category', 'booking__user')
         if user.is_admin_user():
-            return Payment.objects.all()
-        return Payment.objects.filter(booking__user=user)
+            return queryset
+        return queryset.filter(booking__user=user)
 
 
 class CreatePaymentView(APIView):
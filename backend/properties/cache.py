@@ -0,0 +1,37 @@
+"""
+Generation counters for write-driven cache invalidation
+Cache keys embed the current generation; a write bumps it, so every older
+entry is skipped at once and expires on its own. No key-pattern deletes.
+"""
+
+import time
+from django.core.cache import cache
+
+CATALOGUE = 'catalogue'
+BOOKINGS = 'bookings'
+
+
+def bookings_of(property_id):
+    """Generation name of one property's bookings (availability calendar)"""
+    return f'bookings_{property_id}'
+
+
+def _key(name):
+    return f'cache_generation_{name}'
+
+
+def get_generation(name=CATALOGUE):
+    generation = cache.get(_key(name))
+    if generation is None:
+        # Seed from the clock so an evicted counter never reuses old keys
+        cache.add(_key(name), int(time.time() * 1000), None)
+        generation = cache.get(_key(name))
+    return generation
+
+
+def bump_generation(name=CATALOGUE):
+    try:
+        return cache.incr(_key(name))
+    except ValueError:
+        get_generation(name)
+        return cache.incr(_key(name))
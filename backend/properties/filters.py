@@ -0,0 +1,231 @@
+import json
+import math
+import re
+from functools import reduce
+from operator import and_, or_
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, TextField, Value, When
+from django.db.models.functions import Cast, StrIndex
+from django.db.models.lookups import GreaterThan
+from django.utils.dateparse import parse_date
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from bookings.models import Booking
+from . import geo
+
+
+def query_date(request, name, default=None):
+    """ISO date query parameter, default when absent"""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Expected a date (YYYY-MM-DD)'})
+    return parsed
+
+
+class PropertySearchFilter(filters.SearchFilter):
+    """Full-text search backed by Property.search_vector (GIN index).
+
+    Every word is prefix-matched so partially typed terms still use the
+    index, and results are ordered by weighted rank unless an explicit
+    ?ordering= is given. Non-PostgreSQL databases keep DRF's ILIKE search
+    over the view's search_fields.
+    """
+    search_config = 'english'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        words = [word for term in terms for word in re.findall(r'\w+', term)]
+        if not words:
+            return queryset
+
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            search_type='raw',
+            config=self.search_config
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created_at')
+
+
+class PropertyGeoFilter(filters.BaseFilterBackend):
+    """Radius (?near=lat,lng&radius_km=) and viewport (?bbox=) search.
+
+    Candidates are pruned with geohash prefix ranges and a latitude/longitude
+    box, both indexable, and only those rows get the exact haversine check.
+    Radius results are ordered nearest first unless ?ordering= is given.
+    bbox follows GeoJSON order: min_lng,min_lat,max_lng,max_lat.
+    """
+    default_radius_km = 10
+    max_radius_km = 1000
+
+    def filter_queryset(self, request, queryset, view):
+        bbox = request.query_params.get('bbox')
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = self.parse_point_list('bbox', bbox, 4)
+            queryset = self.within(queryset, min_lat, min_lng, max_lat, max_lng)
+
+        near = request.query_params.get('near')
+        if near:
+            latitude, longitude = self.parse_point_list('near', near, 2)
+            radius_km = self.parse_radius(request.query_params.get('radius_km'))
+            queryset = self.within(queryset, *geo.bounding_box(latitude, longitude, radius_km))
+            queryset = queryset.annotate(
+                distance_km=geo.distance_km(latitude, longitude)
+            ).filter(distance_km__lte=radius_km)
+            if api_settings.ORDERING_PARAM not in request.query_params:
+                queryset = queryset.order_by('distance_km')
+
+        return queryset
+
+    def within(self, queryset, min_lat, min_lng, max_lat, max_lng):
+        prefixes = geo.cover(min_lat, min_lng, max_lat, max_lng)
+        if prefixes != ['']:
+            queryset = queryset.filter(
+                reduce(or_, [Q(geohash__startswith=prefix) for prefix in prefixes])
+            )
+
+        longitude = Q(longitude__gte=min_lng, longitude__lte=max_lng)
+        if min_lng > max_lng:
+            longitude = Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng)
+        return queryset.filter(longitude, latitude__gte=min_lat, latitude__lte=max_lat)
+
+    def parse_point_list(self, param, value, count):
+        try:
+            numbers = [float(part) for part in value.split(',')]
+        except ValueError:
+            numbers = []
+        if len(numbers) != count or any(math.isnan(number) for number in numbers):
+            raise ValidationError({param: f'Expected {count} comma-separated numbers'})
+
+        latitudes, longitudes = numbers[1::2], numbers[0::2]
+        if param == 'near':
+            latitudes, longitudes = longitudes, latitudes
+        if any(abs(lat) > 90 for lat in latitudes) or any(abs(lng) > 180 for lng in longitudes):
+            raise ValidationError({param: 'Coordinates out of range'})
+        return numbers
+
+    def parse_radius(self, value):
+        if value in (None, ''):
+            return self.default_radius_km
+        try:
+            radius_km = float(value)
+        except ValueError:
+            radius_km = -1
+        if not 0 < radius_km <= self.max_radius_km:
+            raise ValidationError({'radius_km': f'Must be between 0 and {self.max_radius_km}'})
+        return radius_km
+
+
+class PropertyAvailabilityFilter(filters.BaseFilterBackend):
+    """Properties free on ?available_from=&available_to= (inclusive dates).
+
+    One NOT EXISTS anti-join drops properties with a pending or paid booking
+    in the range; the (property, status, visit_date) index on bookings
+    answers it per property. Either date alone means that single day.
+    """
+    params = ('available_from', 'available_to')
+
+    @classmethod
+    def is_applied(cls, request):
+        return any(request.query_params.get(param) for param in cls.params)
+
+    def filter_queryset(self, request, queryset, view):
+        start = query_date(request, 'available_from')
+        end = query_date(request, 'available_to')
+        if start is None and end is None:
+            return queryset
+        start, end = start or end, end or start
+        if end < start:
+            raise ValidationError({'available_to': 'Must be on or after available_from'})
+
+        return queryset.filter(~Exists(Booking.objects.filter(
+            property=OuterRef('pk'),
+            status__in=Booking.BLOCKING_STATUSES,
+            visit_date__range=(start, end)
+        )))
+
+
+def filter_amenities(queryset, names, match_any=False):
+    """Keep properties listing all (or, with match_any, any) of the amenities.
+
+    On PostgreSQL each name is a jsonb containment test (@>) served by the
+    GIN index on amenities. Other databases look for the JSON-quoted name in
+    the stored text with a case-sensitive position search, so both backends
+    only match whole elements with the exact spelling.
+    """
+    if not names:
+        return queryset
+
+    if connections[queryset.db].vendor == 'postgresql':
+        if not match_any:
+            return queryset.filter(amenities__contains=names)
+        lookups = [Q(amenities__contains=[name]) for name in names]
+    else:
+        text = Cast('amenities', TextField())
+        lookups = [Q(GreaterThan(StrIndex(text, Value(json.dumps(name))), 0)) for name in names]
+
+    return queryset.filter(reduce(or_ if match_any else and_, lookups))
+
+
+def property_facets(queryset, price_buckets):
+    """Counts per category, bedrooms, bathrooms, status and price bucket.
+
+    A single GROUP BY over the combination of all facet columns; each facet
+    is then rolled up from those (few) groups in Python.
+    """
+    price_bucket = Case(
+        *[When(price__lt=edge, then=Value(index)) for index, edge in enumerate(price_buckets)],
+        default=Value(len(price_buckets)),
+        output_field=IntegerField()
+    )
+    groups = (
+        queryset.prefetch_related(None)
+        .order_by()
+        .annotate(price_bucket=price_bucket)
+        .values('category_id', 'category__name', 'bedrooms', 'bathrooms', 'status', 'price_bucket')
+        .annotate(count=Count('id'))
+    )
+
+    categories, bedrooms, bathrooms, statuses, prices = {}, {}, {}, {}, {}
+    total = 0
+    for group in groups:
+        count = group['count']
+        total += count
+        category = categories.setdefault(group['category_id'], {
+            'id': group['category_id'],
+            'name': group['category__name'],
+            'count': 0,
+        })
+        category['count'] += count
+        for facet, value in [
+            (bedrooms, group['bedrooms']),
+            (bathrooms, group['bathrooms']),
+            (statuses, group['status']),
+            (prices, group['price_bucket']),
+        ]:
+            facet[value] = facet.get(value, 0) + count
+
+    edges = [0, *price_buckets, None]
+    return {
+        'total': total,
+        'category': sorted(categories.values(), key=lambda item: (-item['count'], item['name'] or '')),
+        'bedrooms': [{'value': value, 'count': bedrooms[value]} for value in sorted(bedrooms)],
+        'bathrooms': [{'value': value, 'count': bathrooms[value]} for value in sorted(bathrooms)],
+        'status': [{'value': value, 'count': statuses[value]} for value in sorted(statuses)],
+        'price': [
+            {'min': edges[index], 'max': edges[index + 1], 'count': prices.get(index, 0)}
+            for index in range(len(price_buckets) + 1)
+        ],
+    }
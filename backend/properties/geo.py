@@ -0,0 +1,98 @@
+"""
+Geohash grid helpers
+Lets plain PostgreSQL or SQLite prune location queries with a b-tree prefix
+index on Property.geohash before the exact (haversine) distance check.
+"""
+
+import math
+from django.db.models import Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # cells of roughly 5m x 5m
+EARTH_RADIUS_KM = 6371.0088
+MAX_COVER_CELLS = 16
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard geohash: interleaved longitude/latitude bisection bits"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        bounds, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            bounds[0] = middle
+        else:
+            bits = bits * 2
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(latitude degrees, longitude degrees) covered by one cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing the circle.
+
+    min_lng > max_lng means the box crosses the antimeridian.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+
+    delta_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    if delta_lng >= 180:
+        return min_lat, -180.0, max_lat, 180.0
+
+    min_lng = (longitude - delta_lng + 540) % 360 - 180
+    max_lng = (longitude + delta_lng + 540) % 360 - 180
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def cover(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVER_CELLS):
+    """Geohash prefixes of the smallest cells that together cover the box"""
+    if min_lng > max_lng:
+        return (
+            cover(min_lat, min_lng, max_lat, 180.0, max_cells) +
+            cover(min_lat, -180.0, max_lat, max_lng, max_cells)
+        )
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(precision)
+        first_row = int((min_lat + 90) // lat_step)
+        last_row = min(int((max_lat + 90) // lat_step), int(180 / lat_step) - 1)
+        first_col = int((min_lng + 180) // lng_step)
+        last_col = min(int((max_lng + 180) // lng_step), int(360 / lng_step) - 1)
+
+        if (last_row - first_row + 1) * (last_col - first_col + 1) <= max_cells:
+            return sorted({
+                encode(-90 + (row + 0.5) * lat_step, -180 + (col + 0.5) * lng_step, precision)
+                for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)
+            })
+
+    # Box larger than the coarsest grid allows: no pruning
+    return ['']
+
+
+def distance_km(latitude, longitude):
+    """Haversine distance from a point to each row, as a SQL expression"""
+    origin_lat = math.radians(latitude)
+    half_dlat = (Radians('latitude') - origin_lat) / 2
+    half_dlng = (Radians('longitude') - math.radians(longitude)) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(origin_lat) * Cos(Radians('latitude')) * Power(Sin(half_dlng), 2)
+    # Rounding can push a just past 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(a, Value(1.0))))
@@ -0,0 +1,169 @@
+"""
+Responsive image variants
+Renders fixed-width WebP and JPEG copies of uploaded property images in a
+process pool and records their storage names and dimensions on the model.
+Rendering starts once the upload is committed, on a background thread, so it
+adds nothing to the saving request and a rolled-back save leaves no files.
+"""
+
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+from .cache import bump_generation
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = {
+    'thumbnail': 320,
+    'card': 640,
+    'hero': 1600,
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variant(data, width):
+    """Encode one width in every format; runs in a worker process"""
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no alpha channel: flatten onto white
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        else:
+            image = image.convert('RGB')
+
+        # Never upscale
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+        encoded = {}
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            encoded[extension] = (buffer.getvalue(), image.width, image.height)
+        return encoded
+
+
+_pool = None
+_renderer = None
+
+
+def _get_renderer():
+    """One thread per process feeds the pool, so uploads queue instead of competing"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+    return _renderer
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_VARIANT_WORKERS)
+    return _pool
+
+
+def render_variants(data):
+    """{size: {extension: (bytes, width, height)}}, sizes rendered in parallel"""
+    if settings.IMAGE_VARIANT_WORKERS <= 0:
+        return {size: render_variant(data, width) for size, width in VARIANT_WIDTHS.items()}
+
+    global _pool
+    try:
+        futures = {size: _get_pool().submit(render_variant, data, width)
+                   for size, width in VARIANT_WIDTHS.items()}
+        return {size: future.result() for size, future in futures.items()}
+    except BrokenProcessPool:
+        logger.warning("Image variant pool died, rendering inline")
+        _pool = None
+        return {size: render_variant(data, width) for size, width in VARIANT_WIDTHS.items()}
+
+
+def generate_variants(field_file):
+    """Render and store every variant of an uploaded image"""
+    with field_file.open('rb') as source:
+        data = source.read()
+
+    stem = os.path.splitext(field_file.name)[0]
+    variants = {'source': field_file.name}
+    for size, encoded in render_variants(data).items():
+        for extension, (content, width, height) in encoded.items():
+            name = field_file.storage.save(f'{stem}_{size}.{extension}', ContentFile(content))
+            variants.setdefault(size, {})[extension] = {
+                'name': name,
+                'width': width,
+                'height': height,
+            }
+    return variants
+
+
+def delete_variants(storage, variants):
+    for size in VARIANT_WIDTHS:
+        for variant in (variants or {}).get(size, {}).values():
+            storage.delete(variant['name'])
+
+
+def needs_variants(instance, image_field, variants_field):
+    """Whether the image changed since its variants were rendered"""
+    field_file = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    return variants.get('source') != (field_file.name if field_file else None)
+
+
+def schedule_variants(instance, image_field, variants_field):
+    """Render after commit: inline without a pool, else on the background thread"""
+    if not needs_variants(instance, image_field, variants_field):
+        return
+
+    def render():
+        if settings.IMAGE_VARIANT_WORKERS <= 0:
+            refresh_variants(instance, image_field, variants_field)
+        else:
+            _get_renderer().submit(_refresh_stored, type(instance), instance.pk, image_field, variants_field)
+    transaction.on_commit(render)
+
+
+def _refresh_stored(model, pk, image_field, variants_field):
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is not None:
+            refresh_variants(instance, image_field, variants_field)
+    except Exception:
+        logger.exception(f"Could not refresh variants of {model.__name__} {pk}")
+    finally:
+        # This thread's own connections
+        connections.close_all()
+
+
+def refresh_variants(instance, image_field, variants_field):
+    """Regenerate variants when the image changed since they were rendered"""
+    if not needs_variants(instance, image_field, variants_field):
+        return
+    field_file = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    source = field_file.name if field_file else None
+
+    delete_variants(field_file.storage, variants)
+    try:
+        variants = generate_variants(field_file) if field_file else {}
+    except Exception:
+        logger.exception(f"Could not render variants for {source}")
+        # Remember the source so later saves don't retry the failing render
+        variants = {'source': source}
+
+    setattr(instance, variants_field, variants)
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants})
+    # Responses cached since the upload committed point at the original image
+    bump_generation()
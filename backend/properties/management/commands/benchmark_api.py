@@ -0,0 +1,304 @@
+import json
+import math
+import time
+import tracemalloc
+from datetime import date, timedelta
+from io import StringIO
+from itertools import count
+from pathlib import Path
+from unittest.mock import patch
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIClient
+from bookings.models import Booking
+from config.queries import track_queries
+from payments.models import Payment
+from payments.strategy import PaymentStrategy
+from properties import similarity
+from properties.cache import BOOKINGS, bookings_of, bump_generation
+from properties.models import CATEGORY_TREE_CACHE_KEY, Category, Property
+
+User = get_user_model()
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'api-baseline.json'
+# Timings and allocations may grow by --threshold; query counts may not grow at all
+TIMED_METRICS = ('p50_ms', 'p95_ms')
+SIZE_METRICS = ('peak_kib',)
+
+
+class StubPaymentStrategy(PaymentStrategy):
+    """Provider that answers at once, so payment endpoints time only our code"""
+    name = 'stripe'
+
+    def create_payment(self, booking, **kwargs):
+        transaction_id = f'pi_benchmark_{booking.id.hex}'
+        return {
+            'success': True,
+            'transaction_id': transaction_id,
+            'client_secret': f'{transaction_id}_secret',
+            'amount': booking.total_amount,
+            'raw_response': {'id': transaction_id, 'status': 'requires_payment_method'},
+        }
+
+    def confirm_payment(self, payment_id, **kwargs):
+        return {'success': True, 'status': 'success', 'amount': None}
+
+    def refund_payment(self, payment_id, amount=None):
+        return {'success': True, 'refund_id': f're_{payment_id}', 'status': 'succeeded'}
+
+    def get_payment_status(self, transaction_id):
+        return {'success': True, 'status': 'succeeded', 'amount': None}
+
+
+def concrete_host():
+    """First ALLOWED_HOSTS entry usable as a Host header ('*' is not, '.example.com' is example.com)"""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.strip()
+        if host and host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints in-process and compare them with a stored JSON baseline. '
+        'The run is one transaction that is rolled back, so on-commit work (cache generation bumps, '
+        'similarity index changes, image variants) never runs during it: after a write, cached '
+        'responses keep being served where production would miss.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--save', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Allowed growth of p50/p95 latency and peak allocation, as a fraction')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Latency growth below this is noise, whatever the ratio')
+        parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help='Run only these endpoints')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--existing-data', action='store_true',
+                            help='Use the rows already in the database instead of generating a dataset')
+        parser.add_argument('--properties', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.client = APIClient(HTTP_HOST=concrete_host())
+        self.dates = count(1)
+        self.property = None
+        dataset = 'existing' if options['existing_data'] else {
+            'properties': options['properties'], 'users': options['users'], 'seed': options['seed'],
+        }
+
+        # Everything, generated dataset included, is rolled back at the end, so
+        # no on_commit callback fires (see help)
+        try:
+            with transaction.atomic(), patch('payments.views.get_payment_strategy',
+                                             return_value=StubPaymentStrategy()):
+                if not options['existing_data']:
+                    call_command(
+                        'generate_data', properties=options['properties'], users=options['users'],
+                        seed=options['seed'], stdout=StringIO()
+                    )
+                self.load_fixtures()
+                endpoints = self.endpoints()
+                unknown = set(options['only'] or ()) - set(endpoints)
+                if unknown:
+                    raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+                results = {}
+                for name, (setup, call) in endpoints.items():
+                    if not options['only'] or name in options['only']:
+                        results[name] = self.measure(name, setup, call)
+                transaction.set_rollback(True)
+        finally:
+            self.invalidate_rolled_back()
+
+        self.report(results)
+        path = Path(options['baseline'])
+        if options['save']:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({'dataset': dataset, 'endpoints': results}, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline saved to {path}'))
+        elif path.exists():
+            self.compare(json.loads(path.read_text()), dataset, results)
+        else:
+            self.stdout.write(f'No baseline at {path}; run with --save to create one')
+
+    def invalidate_rolled_back(self):
+        """Skip everything cached during the run, which saw rows that were rolled back.
+
+        The cache is not transactional: generations bumped inside the run
+        still point at responses for those rows, so bump them once more.
+        """
+        cache.delete(CATEGORY_TREE_CACHE_KEY)
+        if not self.options['existing_data']:
+            # Workers may have indexed the generated properties
+            similarity.publish()
+        bump_generation()
+        bump_generation(BOOKINGS)
+        if self.property is not None:
+            bump_generation(bookings_of(self.property.pk))
+
+    def load_fixtures(self):
+        """The rows every endpoint works on, picked in a stable order"""
+        self.property = Property.objects.filter(status='active').order_by('slug').first()
+        self.category = Category.objects.filter(children__isnull=False).order_by('tree_path').first()
+        self.customer = (
+            User.objects.filter(bookings__isnull=False, is_staff=False).order_by('pk').first()
+            or User.objects.filter(is_staff=False).order_by('pk').first()
+        )
+        if not (self.property and self.category and self.customer):
+            raise CommandError('The dataset needs an active property, a category with children and a customer')
+
+    def endpoints(self):
+        """name -> (untimed setup returning request kwargs, timed request)"""
+        slug = self.property.slug
+        today = date.today()
+        get = self.client.get
+        post = self.client.post
+        return {
+            'property-list': (None, lambda: get('/api/properties/')),
+            'property-detail': (None, lambda: get(f'/api/properties/{slug}/')),
+            'property-similar': (None, lambda: get(f'/api/properties/{slug}/similar/')),
+            'property-check-availability': (None, lambda: get(
+                f'/api/properties/{slug}/check_availability/',
+                {'start_date': today.isoformat(), 'end_date': (today + timedelta(days=30)).isoformat()}
+            )),
+            'category-children': (None, lambda: get(f'/api/properties/categories/{self.category.slug}/children/')),
+            'booking-list': (None, lambda: get('/api/bookings/')),
+            'booking-create': (
+                lambda: {'data': {'property': str(self.property.pk), 'visit_date': self.free_date().isoformat()}},
+                lambda data: post('/api/bookings/', data, format='json')
+            ),
+            'payment-create': (
+                lambda: {'data': {'booking_id': str(self.pending_booking().pk), 'provider': 'stripe'}},
+                lambda data: post('/api/payments/create/', data, format='json')
+            ),
+            'payment-confirm': (
+                lambda: {'payment_id': self.processing_payment().pk},
+                lambda payment_id: post(f'/api/payments/{payment_id}/confirm/')
+            ),
+        }
+
+    def free_date(self):
+        """A visit date no earlier run has booked"""
+        return date.today() + timedelta(days=3650 + next(self.dates))
+
+    def pending_booking(self):
+        booking = Booking(user=self.customer, property=self.property, visit_date=self.free_date())
+        booking.calculate_amounts()
+        booking.save()
+        return booking
+
+    def processing_payment(self):
+        booking = self.pending_booking()
+        return Payment.objects.create(
+            booking=booking,
+            provider='stripe',
+            transaction_id=f'pi_benchmark_{booking.pk.hex}',
+            amount=booking.total_amount,
+            status='processing',
+        )
+
+    def request(self, setup, call):
+        """One request: (seconds, queries, response)"""
+        kwargs = setup() if setup else {}
+        if self.options['cold']:
+            cache.clear()
+        with track_queries() as stats:
+            started = time.perf_counter()
+            response = call(**kwargs)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise CommandError(f'{response.status_code} response: {response.content[:500]!r}')
+        return elapsed, stats.count
+
+    def measure(self, name, setup, call):
+        self.client.force_authenticate(self.customer)
+        try:
+            for _ in range(self.options['warmup']):
+                self.request(setup, call)
+            timings, queries = [], []
+            for _ in range(self.options['iterations']):
+                elapsed, query_count = self.request(setup, call)
+                timings.append(elapsed * 1000)
+                queries.append(query_count)
+
+            # tracemalloc slows everything down, so allocations get their own pass
+            peaks = []
+            tracemalloc.start()
+            try:
+                for _ in range(min(5, self.options['iterations'])):
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    self.request(setup, call)
+                    peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+            finally:
+                tracemalloc.stop()
+        except CommandError as e:
+            raise CommandError(f'{name}: {e}')
+        finally:
+            self.client.force_authenticate(None)
+
+        timings.sort()
+        return {
+            'requests': len(timings),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'queries': max(queries),
+            'peak_kib': round(sorted(peaks)[len(peaks) // 2], 1),
+        }
+
+    def report(self, results):
+        header = f'{"endpoint":<30}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"peak KiB":>10}'
+        self.stdout.write(header)
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<30}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["queries"]:>9}{result["peak_kib"]:>10.1f}'
+            )
+
+    def compare(self, baseline, dataset, results):
+        if baseline.get('dataset') != dataset:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline was recorded on dataset {baseline.get("dataset")}, this run used {dataset}'
+            ))
+        threshold = self.options['threshold']
+        regressions = []
+        for name, result in results.items():
+            base = baseline['endpoints'].get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(f'{name}: queries {base["queries"]} -> {result["queries"]}')
+            for metric in TIMED_METRICS + SIZE_METRICS:
+                limit = base[metric] * (1 + threshold)
+                if metric in TIMED_METRICS:
+                    limit = max(limit, base[metric] + self.options['min_delta_ms'])
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{name}: {metric} {base[metric]} -> {result[metric]} '
+                        f'(+{(result[metric] / base[metric] - 1) * 100 if base[metric] else math.inf:.0f}%)'
+                    )
+
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(
+                f'{len(regressions)} regression(s) beyond {threshold:.0%} of the baseline'
+            )
+        self.stdout.write(self.style.SUCCESS(f'No regressions beyond {threshold:.0%} of the baseline'))
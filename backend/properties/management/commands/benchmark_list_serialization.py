@@ -0,0 +1,115 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from bookings.models import Booking
+from bookings.serializers import BookingSerializer
+from payments.models import Payment
+from payments.serializers import PaymentSerializer
+from properties.models import Category, Property
+from properties.serializers import PropertyListSerializer
+from properties.values_serializer import ValuesSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compare serializer and values() rendering of the list endpoints on throwaway rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5, help='Best of N runs per measurement')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        request = Request(RequestFactory().get('/api/', HTTP_HOST=settings.ALLOWED_HOSTS[0]))
+        context = {'request': request}
+        endpoints = [
+            ('properties', PropertyListSerializer,
+             Property.objects.select_related('category').order_by('-created_at', 'id')),
+            ('bookings', BookingSerializer,
+             Booking.objects.select_related('property__category', 'user').order_by('-created_at', 'id')),
+            ('payments', PaymentSerializer,
+             Payment.objects.select_related('booking__property__category', 'booking__user')
+             .order_by('-created_at', 'id')),
+        ]
+
+        # Everything runs inside one transaction that is rolled back
+        with transaction.atomic():
+            self.create_rows(sizes[-1])
+            self.stdout.write(f'{"endpoint":<12}{"rows":>6}{"serializer ms":>16}{"values ms":>12}{"speed-up":>10}')
+            for name, serializer_class, queryset in endpoints:
+                for size in sizes:
+                    def serializer_path():
+                        rows = list(queryset[:size])
+                        return JSONRenderer().render(serializer_class(rows, many=True, context=context).data)
+
+                    def values_path():
+                        values = ValuesSerializer(serializer_class(context=context))
+                        return JSONRenderer().render(values.render(values.values(queryset)[:size]))
+
+                    if serializer_path() != values_path():
+                        self.stderr.write(self.style.ERROR(f'{name}: values() output differs at {size} rows'))
+                    slow = self.best_of(serializer_path, options['repeat'])
+                    fast = self.best_of(values_path, options['repeat'])
+                    self.stdout.write(
+                        f'{name:<12}{size:>6}{slow * 1000:>16.2f}{fast * 1000:>12.2f}{slow / fast:>9.1f}x'
+                    )
+            transaction.set_rollback(True)
+
+    def best_of(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def create_rows(self, count):
+        category = Category.objects.create(name='Benchmark', slug='benchmark-list-serialization')
+        user = User.objects.create_user(
+            username='benchmark-list-serialization',
+            email='benchmark-list-serialization@example.com'
+        )
+        properties = Property.objects.bulk_create([
+            Property(
+                name=f'Benchmark Villa {i}',
+                slug=f'benchmark-villa-{i}',
+                description='Benchmark row',
+                location='Miami',
+                category=category,
+                price=Decimal('1000000.00') + i,
+                bedrooms=i % 6,
+                bathrooms=i % 4,
+                amenities=['pool', 'garden'],
+                featured_image=f'properties/benchmark-{i}.jpg',
+            )
+            for i in range(count)
+        ])
+        bookings = []
+        for i, prop in enumerate(properties):
+            booking = Booking(
+                user=user,
+                property=prop,
+                visit_date=date.today() + timedelta(days=i % 90),
+                notes='Benchmark row'
+            )
+            booking.calculate_amounts()
+            bookings.append(booking)
+        Booking.objects.bulk_create(bookings)
+        Payment.objects.bulk_create([
+            Payment(
+                booking=booking,
+                provider='stripe',
+                transaction_id=f'benchmark_{booking.pk}',
+                amount=booking.total_amount,
+                raw_response={'id': f'pi_{i}', 'status': 'succeeded'},
+            )
+            for i, booking in enumerate(bookings)
+        ])
@@ -0,0 +1,260 @@
+import csv
+import json
+import os
+import time
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from properties import geo, similarity
+from properties.cache import bump_generation
+from properties.models import CATEGORY_TREE_CACHE_KEY, Category, Property
+
+# Columns an input file may carry; 'category' is a path such as "Residential/Villa"
+COLUMNS = (
+    'name', 'slug', 'description', 'location', 'latitude', 'longitude', 'category',
+    'price', 'bedrooms', 'bathrooms', 'square_feet', 'amenities', 'status', 'model_3d_url',
+)
+# Not validated per row: generated, maintained elsewhere, or a query per row (FKs)
+UNCHECKED_FIELDS = (
+    'id', 'category', 'geohash', 'search_vector', 'featured_image',
+    'featured_image_variants', 'created_at', 'updated_at',
+)
+
+
+class SlugAllocator:
+    """Unique slugs from one up-front query instead of an exists() per row"""
+
+    def __init__(self, taken, max_length):
+        self.taken = taken
+        self.max_length = max_length
+        self.counters = {}
+
+    def allocate(self, text, fallback):
+        base = slugify(text)[:self.max_length - 8].strip('-') or fallback
+        slug = base
+        counter = self.counters.get(base, 1)
+        while slug in self.taken:
+            counter += 1
+            slug = f'{base}-{counter}'
+        self.counters[base] = counter
+        return slug
+
+
+class Command(BaseCommand):
+    help = 'Stream properties from a CSV or NDJSON file into the catalogue in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (header row) or NDJSON (one object per line) file')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the rows committed by a previous run that stopped on a failed batch')
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create missing categories instead of rejecting their rows')
+        parser.add_argument('--category-separator', default='/')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        self.batch_size = options['batch_size']
+        self.create_categories = options['create_categories']
+        self.separator = options['category_separator']
+
+        # Records committed so far live next to the input until the import completes
+        self.checkpoint_path = f'{path}.import-progress'
+        self.totals = {'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+        if options['resume']:
+            if not os.path.exists(self.checkpoint_path):
+                raise CommandError(f'Nothing to resume: {self.checkpoint_path} does not exist')
+            with open(self.checkpoint_path) as checkpoint:
+                self.totals = json.load(checkpoint)
+            self.stdout.write(f'Resuming after row {self.totals["rows"]}')
+
+        self.load_categories()
+        # slug -> pk of every stored property, the rows this run creates included
+        self.existing = dict(Property.objects.values_list('slug', 'pk'))
+        self.slugs = SlugAllocator(self.existing, Property._meta.get_field('slug').max_length)
+        self.category_slugs = SlugAllocator(
+            set(Category.objects.values_list('slug', flat=True)),
+            Category._meta.get_field('slug').max_length
+        )
+
+        self.started = time.monotonic()
+        self.imported = 0
+        batch = []
+        try:
+            for number, record in enumerate(self.read(path, file_format), start=1):
+                if number <= self.totals['rows']:
+                    continue
+                batch.append((number, record))
+                if len(batch) == self.batch_size:
+                    self.write_batch(batch)
+                    batch = []
+            if batch:
+                self.write_batch(batch)
+        finally:
+            if self.imported:
+                # bulk writes send no signals, so invalidate once for the whole run;
+                # workers rebuild their similarity index lazily, before the bump
+                cache.delete(CATEGORY_TREE_CACHE_KEY)
+                similarity.publish()
+                bump_generation()
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.totals["rows"]} rows: {self.totals["created"]} created, '
+            f'{self.totals["updated"]} updated, {self.totals["skipped"]} skipped'
+        ))
+
+    def read(self, path, file_format):
+        """Yield one dict per record without loading the file"""
+        with open(path, newline='', encoding='utf-8-sig') as source:
+            if file_format == 'csv':
+                reader = csv.DictReader(source)
+                unknown = set(reader.fieldnames or ()) - set(COLUMNS)
+                if unknown:
+                    raise CommandError(f'Unknown columns: {", ".join(sorted(unknown))}')
+                yield from reader
+                return
+            for line in source:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        record = {'__error__': f'invalid JSON: {e}'}
+                    yield record if isinstance(record, dict) else {'__error__': 'not a JSON object'}
+
+    def load_categories(self):
+        """Map lower-cased name paths and slug paths to category ids in one query"""
+        rows = list(Category.objects.values_list('id', 'name', 'slug', 'tree_path'))
+        names = {pk: (name.lower(), slug) for pk, name, slug, tree_path in rows}
+        self.categories = {}
+        for pk, name, slug, tree_path in rows:
+            ancestors = [int(ancestor) for ancestor in tree_path.split('/') if ancestor] or [pk]
+            self.categories[tuple(names[ancestor][0] for ancestor in ancestors)] = pk
+            self.categories[tuple(names[ancestor][1] for ancestor in ancestors)] = pk
+
+    def resolve_category(self, path):
+        parts = [part.strip() for part in path.split(self.separator) if part.strip()]
+        key = tuple(part.lower() for part in parts)
+        if key in self.categories:
+            return self.categories[key]
+        if not self.create_categories:
+            raise ValidationError({'category': f'Unknown category "{path}"'})
+
+        parent_id = None
+        for depth in range(1, len(parts) + 1):
+            if key[:depth] not in self.categories:
+                slug = self.category_slugs.allocate('-'.join(parts[:depth]), 'category')
+                self.category_slugs.taken.add(slug)
+                category = Category.objects.create(name=parts[depth - 1], slug=slug, parent_id=parent_id)
+                self.categories[key[:depth]] = category.pk
+                self.stdout.write(f'Created category {self.separator.join(parts[:depth])}')
+            parent_id = self.categories[key[:depth]]
+        return parent_id
+
+    def build(self, record):
+        """Validated Property for one record, with pk set when its slug exists"""
+        if '__error__' in record:
+            raise ValidationError(record['__error__'])
+        unknown = set(record) - set(COLUMNS)
+        if unknown:
+            raise ValidationError(f'Unknown columns: {", ".join(sorted(unknown))}')
+
+        values = {}
+        for name, raw in record.items():
+            if raw is None or raw == '':
+                continue
+            if name == 'category':
+                values['category_id'] = self.resolve_category(str(raw))
+                continue
+            try:
+                if name == 'amenities' and isinstance(raw, str):
+                    raw = json.loads(raw) if raw.lstrip().startswith('[') else [
+                        amenity.strip() for amenity in raw.split('|') if amenity.strip()
+                    ]
+                values[name] = Property._meta.get_field(name).to_python(raw)
+            except (ValidationError, ValueError) as e:
+                raise ValidationError({name: e.messages if isinstance(e, ValidationError) else [str(e)]})
+        if ('latitude' in values) != ('longitude' in values):
+            raise ValidationError('latitude and longitude must be given together')
+
+        slug = values.get('slug')
+        if slug in self.existing:
+            instance = Property(pk=self.existing[slug], **values)
+            exclude = [field.name for field in Property._meta.concrete_fields if field.name not in values]
+        else:
+            instance = Property(**values)
+            # Missing columns with a model default keep it, as in objects.create()
+            exclude = [
+                field.name for field in Property._meta.concrete_fields
+                if field.name not in values and field.has_default()
+            ]
+            if slug is None:
+                exclude.append('slug')
+                instance.slug = self.slugs.allocate(values.get('name', ''), 'property')
+        instance.clean_fields(exclude=exclude + list(UNCHECKED_FIELDS))
+
+        # save() is bypassed, so derived columns are filled in here
+        if 'latitude' in values:
+            instance.geohash = geo.encode(instance.latitude, instance.longitude)
+        if slug not in self.existing:
+            self.existing[instance.slug] = instance.pk
+            return instance, None
+        fields = [name for name in values if name != 'slug']
+        if 'latitude' in values:
+            fields.append('geohash')
+        instance.updated_at = timezone.now()
+        return instance, tuple(fields) + ('updated_at',)
+
+    def write_batch(self, batch):
+        first, last = batch[0][0], batch[-1][0]
+        creates, updates, skipped = [], {}, 0
+        for number, record in batch:
+            try:
+                instance, fields = self.build(record)
+            except (ValidationError, ValueError) as e:
+                if isinstance(e, ValidationError) and hasattr(e, 'error_dict'):
+                    messages = [f'{field}: {" ".join(errors)}' for field, errors in e.message_dict.items()]
+                else:
+                    messages = e.messages if isinstance(e, ValidationError) else [str(e)]
+                self.stderr.write(f'Row {number} skipped: {"; ".join(messages)}')
+                skipped += 1
+                continue
+            if fields is None:
+                creates.append(instance)
+            else:
+                # bulk_update writes every listed field, so group rows by columns
+                updates.setdefault(fields, []).append(instance)
+
+        try:
+            with transaction.atomic():
+                Property.objects.bulk_create(creates, batch_size=self.batch_size)
+                for fields, instances in updates.items():
+                    Property.objects.bulk_update(instances, fields, batch_size=self.batch_size)
+        except Exception as e:
+            raise CommandError(
+                f'Batch of rows {first}-{last} failed and was rolled back: {e}\n'
+                f'Fix the input and rerun with --resume to continue from row {first}.'
+            )
+
+        updated = sum(len(instances) for instances in updates.values())
+        self.imported += len(creates) + updated
+        self.totals['rows'] = last
+        self.totals['created'] += len(creates)
+        self.totals['updated'] += updated
+        self.totals['skipped'] += skipped
+        with open(self.checkpoint_path, 'w') as checkpoint:
+            json.dump(self.totals, checkpoint)
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f'Rows {first}-{last}: {len(creates)} created, {updated} updated, {skipped} skipped '
+            f'({self.imported / elapsed if elapsed else 0:,.0f} rows/s)'
+        )
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from properties import similarity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the similar-properties feature matrix and make every worker rebuild its own'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write('Building similarity index...')
+        started = time.monotonic()
+
+        index = similarity.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index.ids)} active properties '
+            f'({index.width} features) in {time.monotonic() - started:.2f}s'
+        ))
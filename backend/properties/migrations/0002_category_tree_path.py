@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:36
+
+from django.db import migrations, models
+
+
+def build_tree_paths(apps, schema_editor):
+    Category = apps.get_model('properties', 'Category')
+    parents = dict(Category.objects.values_list('pk', 'parent_id'))
+    paths = {}
+
+    def path_for(pk):
+        if pk not in paths:
+            parent_id = parents[pk]
+            paths[pk] = (path_for(parent_id) if parent_id else '') + f'{pk}/'
+        return paths[pk]
+
+    for pk in parents:
+        path = path_for(pk)
+        Category.objects.filter(pk=pk).update(tree_path=path, depth=path.count('/') - 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='tree_path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_tree_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_DOCUMENT = """
+    setweight(to_tsvector('english', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C')
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE FUNCTION properties_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER properties_search_vector_trigger
+        BEFORE INSERT OR UPDATE ON properties
+        FOR EACH ROW EXECUTE PROCEDURE properties_search_vector_update();
+
+        UPDATE properties SET search_vector = {SEARCH_DOCUMENT.format(row='')};
+
+        CREATE INDEX properties_search_vector_gin ON properties USING gin (search_vector);
+    """)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        DROP INDEX IF EXISTS properties_search_vector_gin;
+        DROP TRIGGER IF EXISTS properties_search_vector_trigger ON properties;
+        DROP FUNCTION IF EXISTS properties_search_vector_update();
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0002_category_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['price', 'id'], name='properties_price_68a452_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at', 'id'], name='properties_created_6f93a0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['name', 'id'], name='properties_name_3ec64a_idx'),
+        ),
+    ]
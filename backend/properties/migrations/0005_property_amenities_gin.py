@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:34
+
+from django.db import migrations
+
+
+def create_amenities_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # jsonb_path_ops is smaller and faster than the default, and only
+    # containment (@>) is needed for the amenity filter
+    schema_editor.execute(
+        "CREATE INDEX properties_amenities_gin ON properties USING gin (amenities jsonb_path_ops)"
+    )
+
+
+def drop_amenities_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS properties_amenities_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0004_property_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_amenities_index, drop_amenities_index),
+    ]
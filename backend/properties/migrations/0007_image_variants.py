@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_property_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='propertyimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
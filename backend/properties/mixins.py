@@ -0,0 +1,35 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Strong ETag / Last-Modified validators for GET responses.
+
+    Views compute validators from cheap fingerprints and call
+    not_modified() before serializing, so revalidation skips the work.
+    """
+
+    def make_etag(self, *parts):
+        fingerprint = '|'.join(str(part) for part in parts)
+        return quote_etag(hashlib.sha256(fingerprint.encode()).hexdigest()[:32])
+
+    def not_modified(self, request, etag, last_modified=None):
+        """304 response when the client's validators still match, else None"""
+        response = get_conditional_response(
+            request._request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None
+        )
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def set_validators(self, response, etag, last_modified=None):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Clients may store the response but must revalidate before reuse
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
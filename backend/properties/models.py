@@ -1,10 +1,16 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.utils.text import slugify
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 import uuid
 
+CATEGORY_TREE_CACHE_KEY = 'category_tree'
+
+
 class Category(models.Model):
-    """Hierarchical Category Tree for DFS traversal"""
+    """Hierarchical Category Tree stored as a materialized path"""
     
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -16,6 +22,11 @@ class Category(models.Model):
         related_name='children'
     )
     description = models.TextField(blank=True)
+    
+    # Materialized path: ancestor ids ending with own id, e.g. "1/4/9/"
+    tree_path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -29,28 +40,144 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        """Keep tree_path/depth correct on insert and move"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields:
+            return super().save(*args, **kwargs)
+        
+        with transaction.atomic():
+            if self._state.adding:
+                # The path ends with our own id, so it is known only after insert
+                super().save(*args, **kwargs)
+                self.tree_path, self.depth = self._build_tree_path()
+                Category.objects.filter(pk=self.pk).update(
+                    tree_path=self.tree_path,
+                    depth=self.depth
+                )
+                return
+            
+            old_path, old_depth = Category.objects.values_list(
+                'tree_path', 'depth'
+            ).get(pk=self.pk)
+            self.tree_path, self.depth = self._build_tree_path(old_path)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'tree_path', 'depth'}
+            super().save(*args, **kwargs)
+            
+            if old_path and old_path != self.tree_path:
+                # Move: rewrite the prefix of every descendant in one statement
+                Category.objects.filter(
+                    tree_path__startswith=old_path
+                ).exclude(pk=self.pk).update(
+                    tree_path=Concat(
+                        Value(self.tree_path),
+                        Substr('tree_path', len(old_path) + 1),
+                        output_field=models.CharField()
+                    ),
+                    depth=F('depth') + (self.depth - old_depth)
+                )
+    
+    def _build_tree_path(self, old_path=''):
+        if self.parent_id is None:
+            return f'{self.pk}/', 0
+        
+        parent_path = Category.objects.values_list(
+            'tree_path', flat=True
+        ).get(pk=self.parent_id)
+        if old_path and parent_path.startswith(old_path):
+            raise ValueError("A category cannot be moved under itself or its descendants")
+        
+        return f'{parent_path}{self.pk}/', parent_path.count('/')
+    
+    def get_ancestor_ids(self):
+        """Ancestor ids from the root down, read from the stored path"""
+        return self._path_ids(self.tree_path)[:-1]
+    
+    def get_ancestors(self):
+        return Category.objects.filter(pk__in=self.get_ancestor_ids()).order_by('depth')
+    
+    def get_descendants(self, include_self=False):
+        """Single indexed prefix query over the materialized path"""
+        descendants = Category.objects.filter(tree_path__startswith=self.tree_path)
+        if not include_self:
+            descendants = descendants.exclude(pk=self.pk)
+        return descendants.order_by('tree_path')
+    
     def get_all_children(self):
-        """DFS Algorithm: Get all descendant categories"""
-        children = []
-        stack = [self]
-        
-        while stack:
-            current = stack.pop()
-            children.append(current)
-            # Add children to stack (DFS)
-            for child in current.children.all():
-                stack.append(child)
-        
-        return children[1:]  # Exclude self
-    
-    def get_path(self):
-        """Get hierarchical path"""
-        path = [self.name]
-        current = self.parent
-        while current:
-            path.insert(0, current.name)
-            current = current.parent
+        """Get all descendant categories"""
+        return list(self.get_descendants())
+    
+    def get_path(self, names=None):
+        """Get hierarchical path; names maps ancestor ids to names when already loaded"""
+        ancestor_ids = self.get_ancestor_ids()
+        if names is None:
+            names = dict(
+                Category.objects.filter(pk__in=ancestor_ids).values_list('pk', 'name')
+            ) if ancestor_ids else {}
+        path = [names[pk] for pk in ancestor_ids if pk in names]
+        path.append(self.name)
         return ' > '.join(path)
+    
+    @classmethod
+    def get_tree(cls):
+        """Whole hierarchy as nested dicts with active property counts (cached)"""
+        from django.core.cache import cache
+        from django.db.models import Count
+        
+        tree = cache.get(CATEGORY_TREE_CACHE_KEY)
+        if tree is not None:
+            return tree
+        
+        categories = list(cls.objects.order_by('tree_path').values(
+            'id', 'name', 'slug', 'parent_id', 'tree_path', 'depth'
+        ))
+        direct_counts = dict(
+            Property.objects.filter(status='active', category__isnull=False)
+            .values('category_id')
+            .annotate(count=Count('id'))
+            .values_list('category_id', 'count')
+        )
+        
+        nodes = {}
+        for category in categories:
+            nodes[category['id']] = {
+                'id': category['id'],
+                'name': category['name'],
+                'slug': category['slug'],
+                'parent': category['parent_id'],
+                'depth': category['depth'],
+                'path': ' > '.join(
+                    [nodes[pk]['name'] for pk in cls._path_ids(category['tree_path'])[:-1] if pk in nodes]
+                    + [category['name']]
+                ),
+                'property_count': direct_counts.get(category['id'], 0),
+                'total_property_count': 0,
+                'children': [],
+            }
+        
+        tree = []
+        for category in categories:
+            node = nodes[category['id']]
+            # Roll each direct count up into every ancestor on the path
+            for pk in cls._path_ids(category['tree_path']):
+                if pk in nodes:
+                    nodes[pk]['total_property_count'] += node['property_count']
+            parent = nodes.get(category['parent_id'])
+            if parent is not None:
+                parent['children'].append(node)
+            else:
+                tree.append(node)
+        
+        for node in [*nodes.values(), {'children': tree}]:
+            node['children'].sort(key=lambda child: child['name'])
+        
+        cache.set(CATEGORY_TREE_CACHE_KEY, tree, None)
+        return tree
+    
+    @staticmethod
+    def _path_ids(tree_path):
+        return [int(pk) for pk in tree_path.split('/') if pk]
 
 
 class Property(models.Model):
@@ -68,6 +195,19 @@ class Property(models.Model):
     description = models.TextField()
     location = models.CharField(max_length=255)
     
+    # Coordinates, with a geohash grid cell for indexed radius/viewport search
+    latitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    
     # Category relationship
     category = models.ForeignKey(
         Category,
@@ -91,6 +231,8 @@ class Property(models.Model):
     
     # Images
     featured_image = models.ImageField(upload_to='properties/', blank=True, null=True)
+    # Resized copies of featured_image, see properties.images
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
@@ -98,6 +240,10 @@ class Property(models.Model):
     # 3D Model URL (for Three.js)
     model_3d_url = models.URLField(blank=True, null=True)
     
+    # Weighted full-text document (name > location > description),
+    # maintained by a PostgreSQL trigger, see migration 0003
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -110,6 +256,10 @@ class Property(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['price']),
             models.Index(fields=['category']),
+            # Keyset pagination: one per ordering field, id as tiebreaker
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['name', 'id']),
         ]
         ordering = ['-created_at']
     
@@ -117,10 +267,59 @@ class Property(models.Model):
         return self.name
     
     def save(self, *args, **kwargs):
+        from . import geo
+        
         if not self.slug:
             self.slug = slugify(self.name)
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
         super().save(*args, **kwargs)
     
+    @classmethod
+    def get_amenity_vocabulary(cls):
+        """All amenities of active properties with counts, in one grouped query (cached)"""
+        from django.core.cache import cache
+        from .cache import get_generation
+        
+        cache_key = f'amenity_vocabulary_{get_generation()}'
+        vocabulary = cache.get(cache_key)
+        if vocabulary is not None:
+            return vocabulary
+        
+        connection = connections[cls.objects.db]
+        if connection.vendor == 'postgresql':
+            sql = """
+                SELECT amenity, COUNT(*) FROM properties
+                CROSS JOIN LATERAL jsonb_array_elements_text(
+                    CASE WHEN jsonb_typeof(amenities) = 'array' THEN amenities ELSE '[]'::jsonb END
+                ) AS amenity
+                WHERE status = 'active'
+                GROUP BY amenity
+            """
+        else:
+            sql = """
+                SELECT amenity.value, COUNT(*) FROM properties, json_each(
+                    CASE WHEN json_type(amenities) = 'array' THEN amenities ELSE '[]' END
+                ) AS amenity
+                WHERE status = 'active' AND amenity.type = 'text'
+                GROUP BY amenity.value
+            """
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        
+        vocabulary = [
+            {'name': name, 'count': count}
+            for name, count in sorted(rows, key=lambda row: (-row[1], row[0]))
+        ]
+        cache.set(cache_key, vocabulary, 3600)
+        return vocabulary
+    
     def is_available(self):
         """OOP Method: Check if property is available"""
         return self.status == 'active'
@@ -131,40 +330,29 @@ class Property(models.Model):
         
         overlapping_bookings = Booking.objects.filter(
             property=self,
-            status__in=['pending', 'paid'],
+            status__in=Booking.BLOCKING_STATUSES,
             visit_date__range=[start_date, end_date]
         )
         
         return not overlapping_bookings.exists()
     
     def get_similar_properties(self, limit=5):
-        """Algorithm: Get similar properties using category tree (DFS)"""
+        """Algorithm: k-nearest neighbours over the in-memory feature matrix"""
         from django.core.cache import cache
+        from . import similarity
+        from .cache import get_generation
         
-        cache_key = f'similar_properties_{self.id}'
-        cached_result = cache.get(cache_key)
+        # Only ids are cached (empty results too); any catalogue write
+        # bumps the generation and so invalidates every entry
+        cache_key = f'similar_properties_{get_generation()}_{self.id}_{limit}'
+        ids = cache.get(cache_key)
         
-        if cached_result:
-            return cached_result
+        if ids is None:
+            ids = tuple(similarity.nearest(self, limit))
+            cache.set(cache_key, ids, 3600)
         
-        # Get all categories in the tree
-        if self.category:
-            related_categories = self.category.get_all_children()
-            related_categories.append(self.category)
-            
-            similar = Property.objects.filter(
-                category__in=related_categories,
-                status='active'
-            ).exclude(id=self.id)[:limit]
-        else:
-            similar = Property.objects.filter(
-                status='active',
-                price__range=[self.price * 0.8, self.price * 1.2]
-            ).exclude(id=self.id)[:limit]
-        
-        # Cache for 1 hour
-        cache.set(cache_key, similar, 3600)
-        return similar
+        found = Property.objects.select_related('category').filter(status='active').in_bulk(ids)
+        return [found[pk] for pk in ids if pk in found]
 
 
 class PropertyImage(models.Model):
@@ -176,6 +364,7 @@ class PropertyImage(models.Model):
         related_name='images'
     )
     image = models.ImageField(upload_to='properties/gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.CharField(max_length=255, blank=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
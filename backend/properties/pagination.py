@@ -0,0 +1,241 @@
+import base64
+import json
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on (ordering field, id).
+
+    The cursor carries the ordering value and id of the row at the page
+    boundary, so every page is one index range scan with LIMIT, whatever its
+    depth, and no COUNT(*) is run. The ordering field comes from ?ordering=
+    restricted to the view's ordering_fields; id makes the order total.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-created_at'
+    tiebreaker = 'id'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, view)
+        cursor = self.decode_cursor(request, queryset.model)
+        backwards = bool(cursor and cursor['previous'])
+
+        # Walking backwards reads the page in reverse and flips it afterwards
+        reverse = self.descending != backwards
+        prefix = '-' if reverse else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}{self.tiebreaker}')
+
+        if cursor:
+            op = 'lt' if reverse else 'gt'
+            # "field >= v" bounds the index scan, the OR only resolves ties
+            queryset = queryset.filter(
+                **{f'{self.field}__{op}e': cursor['value']}
+            ).filter(
+                Q(**{f'{self.field}__{op}': cursor['value']}) |
+                Q(**{f'{self.tiebreaker}__{op}': cursor['key']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if backwards:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = cursor is not None, has_more
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request, view):
+        allowed = getattr(view, 'ordering_fields', None) or []
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM, '')
+        ordering = ordering.split(',')[0].strip() or self.default_ordering
+        if ordering.lstrip('-') not in allowed:
+            ordering = self.default_ordering
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(cursor['v'], str) or not isinstance(cursor['k'], str):
+                raise ValueError(encoded)
+            return {
+                # Parse here so a forged cursor is a 404, not an error in .filter()
+                'value': model._meta.get_field(self.field).to_python(cursor['v']),
+                'key': uuid.UUID(cursor['k']),
+                'previous': bool(cursor.get('p')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, previous):
+        value = getattr(row, self.field)
+        cursor = {
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'k': str(getattr(row, self.tiebreaker)),
+        }
+        if previous:
+            cursor['p'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('ascii')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], previous=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], previous=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+
+def estimate_count(queryset):
+    """PostgreSQL planner row estimate for queryset, None on other databases.
+
+    Unfiltered querysets read pg_class.reltuples (kept by ANALYZE/autovacuum);
+    anything else takes the top plan node's row estimate from EXPLAIN.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    queryset = queryset.order_by()
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.has_filters() and not query.distinct and query.group_by is None:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # -1 until the table has been analyzed
+            return row[0] if row and row[0] >= 0 else None
+
+        sql, params = query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ProbedPage(list):
+    """Page whose successor is detected by reading one extra row, not counted"""
+
+    def __init__(self, rows, number, has_next):
+        super().__init__(rows)
+        self.number = number
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """Page numbers with a count that is exact, estimated or skipped.
+
+    Counts come from the planner estimate once it reaches
+    PAGINATION_ESTIMATE_THRESHOLD rows; smaller results are counted exactly.
+    ?count=false skips the count altogether. When the count is not exact,
+    next/previous are found by reading page_size + 1 rows, so "?page=last"
+    is unavailable. count_type in the response is "exact", "estimated" or
+    null.
+    """
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.count, self.count_type = None, None
+        if request.query_params.get(self.count_query_param, '').lower() not in ('false', '0'):
+            estimate = estimate_count(queryset)
+            if estimate is None or estimate < settings.PAGINATION_ESTIMATE_THRESHOLD:
+                rows = super().paginate_queryset(queryset, request, view)
+                self.count, self.count_type = self.page.paginator.count, 'exact'
+                return rows
+            self.count, self.count_type = estimate, 'estimated'
+
+        try:
+            number = int(request.query_params.get(self.page_query_param, 1))
+            if number < 1:
+                raise ValueError(number)
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message)
+        self.page = ProbedPage(rows[:page_size], number, len(rows) > page_size)
+        self.request = request
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_type', self.count_type),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count']['nullable'] = True
+        response_schema['properties'] = {
+            'count': response_schema['properties'].pop('count'),
+            'count_type': {'type': 'string', 'nullable': True, 'enum': ['exact', 'estimated']},
+            **response_schema['properties'],
+        }
+        return response_schema
@@ -1,57 +1,199 @@
+from django.db import models
 from rest_framework import serializers
 from .models import Category, Property, PropertyImage
 
+
+def parse_fieldset(value):
+    """'id,property.name,property.price' -> {'id': {}, 'property': {'name': {}, 'price': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldset:
+    """Fields a client asked for with ?fields=, ?omit= and ?expand=.
+
+    fields and omit take comma-separated, dot-nested names. expand lists the
+    nested relations rendered in full; when it is given, every other nested
+    relation collapses to its primary key. Without it all are expanded.
+    """
+    
+    def __init__(self, fields=None, omit=None, expand=None):
+        self.fields = fields
+        self.omit = omit
+        self.expand = expand
+    
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params if request is not None else {}
+        fields, omit, expand = [
+            parse_fieldset(params[name]) if name in params else None
+            for name in ('fields', 'omit', 'expand')
+        ]
+        # An empty ?fields= or ?omit= is absent; an empty ?expand= collapses every relation
+        return cls(fields or None, omit or None, expand)
+    
+    def is_default(self):
+        return self.fields is None and self.omit is None and self.expand is None
+    
+    def wants(self, name):
+        if self.fields is not None and name not in self.fields:
+            return False
+        # "omit=property" drops the field, "omit=property.notes" only a subfield
+        return self.omit is None or self.omit.get(name, True) != {}
+    
+    def expands(self, name):
+        return self.expand is None or name in self.expand
+    
+    def child(self, name):
+        fields = self.fields.get(name) if self.fields is not None else None
+        omit = self.omit.get(name) if self.omit is not None else None
+        expand = self.expand.get(name, {}) if self.expand is not None else None
+        return SparseFieldset(fields or None, omit or None, expand)
+
+
+class SparseFieldsetMixin:
+    """Drop unrequested fields before anything is evaluated.
+
+    The top-level serializer reads the fieldset from the request and prunes
+    nested serializers itself; SerializerMethodFields that are dropped never
+    run. Views use the same SparseFieldset to skip unneeded joins.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fieldset = kwargs.pop('fieldset', None)
+        super().__init__(*args, **kwargs)
+        if fieldset is None and 'request' in self.context:
+            fieldset = SparseFieldset.from_request(self.context['request'])
+        self.fieldset = fieldset or SparseFieldset()
+        if not self.fieldset.is_default():
+            self.apply_fieldset(self.fieldset)
+    
+    def apply_fieldset(self, fieldset):
+        self.fieldset = fieldset
+        for name in list(self.fields):
+            field = self.fields[name]
+            if not fieldset.wants(name):
+                self.fields.pop(name)
+                continue
+            
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if not fieldset.expands(name):
+                kwargs = {'source': field.source} if field.source != name else {}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many, **kwargs)
+            elif isinstance(nested, serializers.Serializer):
+                # Works for plain nested serializers too, e.g. UserSerializer
+                SparseFieldsetMixin.apply_fieldset(nested, fieldset.child(name))
+
+class VariantImageField(serializers.ImageField):
+    """URL of the ?image_size= variant (WebP, or JPEG with ?image_format=jpeg).
+
+    Falls back to the original upload when no size is requested or the
+    variant has not been rendered.
+    """
+    
+    def __init__(self, variants_field, **kwargs):
+        self.variants_field = variants_field
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        request = self.context.get('request')
+        size = request.query_params.get('image_size') if request else None
+        if value and size:
+            image_format = 'jpeg' if request.query_params.get('image_format') == 'jpeg' else 'webp'
+            variants = getattr(value.instance, self.variants_field, None) or {}
+            variant = variants.get(size, {}).get(image_format)
+            if variant:
+                return request.build_absolute_uri(value.storage.url(variant['name']))
+        return super().to_representation(value)
+
+
+class CategoryListSerializer(serializers.ListSerializer):
+    """Load the ancestor names of all rendered categories in one query"""
+    
+    def to_representation(self, data):
+        categories = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        ancestor_ids = {pk for category in categories for pk in category.get_ancestor_ids()}
+        self.child.ancestor_names = dict(
+            Category.objects.filter(pk__in=ancestor_ids).values_list('pk', 'name')
+        ) if ancestor_ids else {}
+        return super().to_representation(categories)
+
+
 class CategorySerializer(serializers.ModelSerializer):
     children_count = serializers.SerializerMethodField()
     path = serializers.SerializerMethodField()
+    ancestor_names = None
     
     class Meta:
         model = Category
         fields = ('id', 'name', 'slug', 'parent', 'description', 
                   'children_count', 'path', 'created_at')
+        list_serializer_class = CategoryListSerializer
     
     def get_children_count(self, obj):
+        if hasattr(obj, 'num_children'):
+            return obj.num_children
         return obj.children.count()
     
     def get_path(self, obj):
-        return obj.get_path()
+        return obj.get_path(self.ancestor_names)
+    
+    def validate_parent(self, value):
+        if value and self.instance and value.tree_path.startswith(self.instance.tree_path):
+            raise serializers.ValidationError("A category cannot be moved under itself or its descendants")
+        return value
 
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    image = VariantImageField('image_variants', read_only=True)
+    
     class Meta:
         model = PropertyImage
         fields = ('id', 'image', 'caption', 'order')
 
 
-class PropertyListSerializer(serializers.ModelSerializer):
+class PropertyListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
+    featured_image = VariantImageField('featured_image_variants', read_only=True)
     
     class Meta:
         model = Property
-        fields = ('id', 'name', 'slug', 'location', 'price', 'bedrooms', 
-                  'bathrooms', 'featured_image', 'status', 'category_name')
+        fields = ('id', 'name', 'slug', 'location', 'latitude', 'longitude', 'price',
+                  'bedrooms', 'bathrooms', 'featured_image', 'status', 'category_name')
 
 
-class PropertyDetailSerializer(serializers.ModelSerializer):
+class PropertyDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
+    featured_image = VariantImageField('featured_image_variants', read_only=True)
     similar_properties = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
-        fields = '__all__'
+        exclude = ('search_vector', 'geohash', 'featured_image_variants')
     
     def get_similar_properties(self, obj):
         similar = obj.get_similar_properties()
-        return PropertyListSerializer(similar, many=True).data
+        return PropertyListSerializer(
+            similar,
+            many=True,
+            fieldset=self.fieldset.child('similar_properties')
+        ).data
 
 
 class PropertyCreateUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Property
-        fields = ('name', 'description', 'location', 'category', 'price', 
-                  'bedrooms', 'bathrooms', 'square_feet', 'amenities', 
-                  'featured_image', 'model_3d_url', 'status')
+        fields = ('name', 'description', 'location', 'latitude', 'longitude',
+                  'category', 'price', 'bedrooms', 'bathrooms', 'square_feet',
+                  'amenities', 'featured_image', 'model_3d_url', 'status')
     
     def validate_price(self, value):
         if value <= 0:
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from bookings.models import Booking
+from . import images, similarity
+from .cache import BOOKINGS, bookings_of, bump_generation
+from .models import CATEGORY_TREE_CACHE_KEY, Category, Property, PropertyImage
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_category_tree(sender, **kwargs):
+    """Property counts and structure of the tree change with either model"""
+    # After commit: Category.save() rewrites descendant paths after post_save
+    transaction.on_commit(lambda: cache.delete(CATEGORY_TREE_CACHE_KEY))
+
+
+@receiver([post_save, post_delete], sender=Property)
+def publish_similarity_change(sender, instance, **kwargs):
+    """Workers replay the row on their next query instead of rebuilding"""
+    # Before the generation bump, so no worker caches ids from a matrix without it
+    pk = instance.pk
+    transaction.on_commit(lambda: similarity.publish([pk]))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def publish_similarity_rebuild(sender, **kwargs):
+    """Category moves change the path features of every property below them"""
+    transaction.on_commit(similarity.publish)
+
+
+@receiver(post_save, sender=Property)
+def render_featured_image_variants(sender, instance, **kwargs):
+    images.schedule_variants(instance, 'featured_image', 'featured_image_variants')
+
+
+@receiver(post_save, sender=PropertyImage)
+def render_gallery_image_variants(sender, instance, **kwargs):
+    images.schedule_variants(instance, 'image', 'image_variants')
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Property)
+@receiver([post_save, post_delete], sender=PropertyImage)
+def bump_catalogue_generation(sender, **kwargs):
+    """Invalidates cached responses, similar-property ids and other catalogue results"""
+    transaction.on_commit(bump_generation)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def bump_bookings_generation(sender, instance, **kwargs):
+    """Calendar ETags change for the booked property only, availability-filtered lists for all"""
+    property_id = instance.property_id
+    transaction.on_commit(lambda: bump_generation(bookings_of(property_id)))
+    transaction.on_commit(lambda: bump_generation(BOOKINGS))
+
@@ -0,0 +1,245 @@
+"""
+Similar-properties engine
+Keeps a feature matrix of all active properties in memory and answers
+k-nearest-neighbour queries against it with NumPy.
+
+Each worker builds its own matrix. Committed writes bump a shared version
+and record the changed property ids under it, so workers replay just those
+rows; a change without ids (category edits, bulk loads) forces a rebuild.
+"""
+
+import math
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from .cache import bump_generation, get_generation
+
+INDEX_GENERATION = 'similarity_index'
+# Versions a worker may fall behind and still catch up row by row
+MAX_PENDING_CHANGES = 100
+
+ROW_FIELDS = ('id', 'price', 'bedrooms', 'bathrooms', 'square_feet',
+              'amenities', 'category__tree_path')
+
+# Relative importance of each feature group in the distance
+NUMERIC_WEIGHTS = np.array([2.0, 1.0, 1.0, 1.0])  # price, bedrooms, bathrooms, square_feet
+CATEGORY_WEIGHT = 1.5
+CATEGORY_DECAY = 0.5  # each ancestor counts half as much as the level below it
+AMENITY_WEIGHT = 1.0
+
+
+def _path_ids(tree_path):
+    return [int(pk) for pk in (tree_path or '').split('/') if pk]
+
+
+def _numeric(row):
+    square_feet = row['square_feet']
+    return [
+        math.log1p(float(row['price'])),
+        row['bedrooms'],
+        row['bathrooms'],
+        math.log1p(square_feet) if square_feet else np.nan,
+    ]
+
+
+def row_for(instance):
+    """Feature row for a Property instance, same shape as the values() rows"""
+    return {
+        'id': instance.pk,
+        'price': instance.price,
+        'bedrooms': instance.bedrooms,
+        'bathrooms': instance.bathrooms,
+        'square_feet': instance.square_feet,
+        'amenities': instance.amenities,
+        'category__tree_path': instance.category.tree_path if instance.category_id else '',
+    }
+
+
+class SimilarityIndex:
+    """Standardized numeric features, decayed category path and amenities"""
+
+    def __init__(self, rows, version=0):
+        self.built_at = time.time()
+        self.version = version
+        self.stale = False
+        self.ids = [row['id'] for row in rows]
+        self.positions = {pk: position for position, pk in enumerate(self.ids)}
+
+        category_ids = sorted({pk for row in rows for pk in _path_ids(row['category__tree_path'])})
+        amenities = sorted({name for row in rows for name in row['amenities'] or []})
+        self.category_columns = {pk: 4 + column for column, pk in enumerate(category_ids)}
+        self.amenity_columns = {
+            name: 4 + len(category_ids) + column for column, name in enumerate(amenities)
+        }
+        self.width = 4 + len(category_ids) + len(amenities)
+
+        # Column mean/std ignoring missing values (square_feet is optional)
+        numeric = np.array([_numeric(row) for row in rows], dtype=float).reshape(-1, 4)
+        present = ~np.isnan(numeric)
+        counts = np.maximum(present.sum(axis=0), 1)
+        self.mean = np.where(present, numeric, 0.0).sum(axis=0) / counts
+        std = np.sqrt(np.square(np.where(present, numeric - self.mean, 0.0)).sum(axis=0) / counts)
+        self.std = np.where(std > 0, std, 1.0)
+
+        self.matrix = np.zeros((len(rows), self.width))
+        for position, row in enumerate(rows):
+            self.matrix[position] = self.vectorize(row)
+
+    @classmethod
+    def build(cls, chunk_size=2000):
+        from .models import Property
+
+        # Read before the rows, so a change published during the read is replayed
+        version = get_generation(INDEX_GENERATION)
+        rows = Property.objects.filter(status='active').values(*ROW_FIELDS)
+        return cls(list(rows.iterator(chunk_size=chunk_size)), version)
+
+    def expired(self):
+        return time.time() - self.built_at > settings.SIMILARITY_INDEX_TTL
+
+    def covers(self, row):
+        """Whether the row's categories and amenities all have columns"""
+        return (
+            all(pk in self.category_columns for pk in _path_ids(row['category__tree_path'])) and
+            all(name in self.amenity_columns for name in row['amenities'] or [])
+        )
+
+    def vectorize(self, row):
+        vector = np.zeros(self.width)
+        numeric = np.array(_numeric(row), dtype=float)
+        numeric = np.where(np.isnan(numeric), self.mean, numeric)
+        vector[:4] = (numeric - self.mean) / self.std * NUMERIC_WEIGHTS
+
+        weight = CATEGORY_WEIGHT
+        for pk in reversed(_path_ids(row['category__tree_path'])):
+            if pk in self.category_columns:
+                vector[self.category_columns[pk]] = weight
+            weight *= CATEGORY_DECAY
+
+        amenities = [name for name in row['amenities'] or [] if name in self.amenity_columns]
+        for name in amenities:
+            vector[self.amenity_columns[name]] = AMENITY_WEIGHT / math.sqrt(len(amenities))
+        return vector
+
+    def nearest(self, row, k):
+        """Ids of the k closest active properties, excluding the row itself"""
+        if not self.ids or k <= 0:
+            return []
+
+        position = self.positions.get(row['id'])
+        vector = self.matrix[position] if position is not None else self.vectorize(row)
+        distances = np.square(self.matrix - vector).sum(axis=1)
+        if position is not None:
+            distances[position] = np.inf
+
+        k = min(k, len(self.ids) - (position is not None))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return [self.ids[position] for position in nearest]
+
+    def upsert(self, row, active=True):
+        if not active:
+            return self.remove(row['id'])
+        if not self.covers(row):
+            # New category or amenity: needs new columns, rebuild on next query
+            self.stale = True
+            return
+
+        vector = self.vectorize(row)
+        position = self.positions.get(row['id'])
+        if position is not None:
+            self.matrix[position] = vector
+        else:
+            self.positions[row['id']] = len(self.ids)
+            self.ids.append(row['id'])
+            self.matrix = np.vstack([self.matrix, vector])
+
+    def remove(self, pk):
+        position = self.positions.get(pk)
+        if position is None:
+            return
+        self.matrix = np.delete(self.matrix, position, axis=0)
+        del self.ids[position]
+        self.positions = {pk: position for position, pk in enumerate(self.ids)}
+
+
+def _change_key(version):
+    return f'property_similarity_change_{version}'
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Process-local index, caught up with published changes or rebuilt"""
+    global _index
+    version = get_generation(INDEX_GENERATION)
+
+    with _lock:
+        index = _index
+        if index is None or index.stale or index.expired():
+            index = _index = SimilarityIndex.build()
+        elif version > index.version and not _replay(index, version):
+            index = _index = SimilarityIndex.build()
+        return index
+
+
+def _replay(index, version):
+    """Apply the rows changed since index.version; False when a rebuild is needed"""
+    from .models import Property
+
+    if version - index.version > MAX_PENDING_CHANGES:
+        return False
+    keys = [_change_key(number) for number in range(index.version + 1, version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        # A full change, or one that expired or is still being recorded
+        return False
+
+    ids = set().union(*changes.values())
+    rows = Property.objects.filter(pk__in=ids, status='active').values(*ROW_FIELDS)
+    rows = {row['id']: row for row in rows}
+    for pk in ids:
+        if pk in rows:
+            index.upsert(rows[pk])
+        else:
+            index.remove(pk)
+    index.version = version
+    # upsert() marks it stale when a row needs new category or amenity columns
+    return not index.stale
+
+
+def nearest(instance, k):
+    index = get_index()
+    with _lock:
+        return index.nearest(row_for(instance), k)
+
+
+def rebuild():
+    """Build here from the database and make every other worker rebuild too"""
+    global _index
+    publish()
+    index = SimilarityIndex.build()
+    with _lock:
+        _index = index
+    return index
+
+
+def publish(ids=None):
+    """Tell every worker which properties changed (all, without ids); call after commit"""
+    version = bump_generation(INDEX_GENERATION)
+    if ids is not None:
+        cache.set(_change_key(version), list(ids), settings.SIMILARITY_INDEX_TTL)
+    return version
+
+
+def reset():
+    """Drop the local copy"""
+    global _index
+    with _lock:
+        _index = None
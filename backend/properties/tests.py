@@ -1,9 +1,30 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from datetime import date, time, timedelta
 from decimal import Decimal
-from .models import Category, Property
+from io import BytesIO, StringIO
+from PIL import Image
+import base64
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from unittest.mock import patch
+from bookings.models import Booking
+from . import geo, images, similarity
+from .cache import BOOKINGS, get_generation
+from .management.commands.benchmark_api import Command as BenchmarkCommand
+from .models import CATEGORY_TREE_CACHE_KEY, Category, Property, PropertyImage
+from .pagination import EstimatedCountPagination
 
 User = get_user_model()
 
@@ -46,6 +67,108 @@ class CategoryModelTest(TestCase):
         path = self.luxury_villa.get_path()
         self.assertEqual(path, 'Residential > Villa > Luxury Villa')
 
+    def test_tree_path_on_insert(self):
+        self.assertEqual(self.residential.tree_path, f'{self.residential.pk}/')
+        self.assertEqual(
+            self.luxury_villa.tree_path,
+            f'{self.residential.pk}/{self.villa.pk}/{self.luxury_villa.pk}/'
+        )
+        self.assertEqual(self.luxury_villa.depth, 2)
+
+    def test_descendants_and_path_single_query(self):
+        with self.assertNumQueries(1):
+            children = self.residential.get_all_children()
+        self.assertEqual(children, [self.villa, self.luxury_villa])
+
+        with self.assertNumQueries(1):
+            self.luxury_villa.get_path()
+
+    def test_move_rewrites_descendant_paths(self):
+        commercial = Category.objects.create(name='Commercial', slug='commercial')
+        self.villa.parent = commercial
+        self.villa.save()
+
+        self.luxury_villa.refresh_from_db()
+        self.assertEqual(
+            self.luxury_villa.tree_path,
+            f'{commercial.pk}/{self.villa.pk}/{self.luxury_villa.pk}/'
+        )
+        self.assertEqual(self.residential.get_all_children(), [])
+        self.assertEqual(self.luxury_villa.get_path(), 'Commercial > Villa > Luxury Villa')
+
+        self.villa.parent = None
+        self.villa.save()
+        self.luxury_villa.refresh_from_db()
+        self.assertEqual(self.luxury_villa.depth, 1)
+
+    def test_move_under_descendant_rejected(self):
+        self.residential.parent = self.luxury_villa
+        with self.assertRaises(ValueError):
+            self.residential.save()
+
+    def test_delete_removes_subtree(self):
+        self.villa.delete()
+        self.assertEqual(self.residential.get_all_children(), [])
+
+
+class CategoryTreeAPITest(APITestCase):
+    """Test nested category tree endpoint"""
+
+    def setUp(self):
+        self.residential = Category.objects.create(name='Residential', slug='residential')
+        self.villa = Category.objects.create(name='Villa', slug='villa', parent=self.residential)
+        self.apartment = Category.objects.create(name='Apartment', slug='apartment', parent=self.residential)
+        self.commercial = Category.objects.create(name='Commercial', slug='commercial')
+
+        for index, category in enumerate([self.villa, self.villa, self.apartment]):
+            Property.objects.create(
+                name=f'Property {index}',
+                description='Test',
+                location='Miami',
+                category=category,
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2
+            )
+        Property.objects.create(
+            name='Sold Villa',
+            description='Test',
+            location='Miami',
+            category=self.villa,
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2,
+            status='sold'
+        )
+
+    def test_tree_counts(self):
+        response = self.client.get('/api/properties/categories/tree/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        commercial, residential = response.data
+        self.assertEqual(commercial['total_property_count'], 0)
+        self.assertEqual(residential['property_count'], 0)
+        self.assertEqual(residential['total_property_count'], 3)
+
+        apartment, villa = residential['children']
+        self.assertEqual(villa['property_count'], 2)
+        self.assertEqual(apartment['property_count'], 1)
+        self.assertEqual(villa['path'], 'Residential > Villa')
+
+    def test_tree_is_cached_until_write(self):
+        self.client.get('/api/properties/categories/tree/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/properties/categories/tree/')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Category.objects.create(name='Penthouse', slug='penthouse', parent=self.apartment)
+            # Not before commit: a concurrent read would re-cache the old tree
+            self.assertIsNotNone(cache.get(CATEGORY_TREE_CACHE_KEY))
+        self.assertTrue(callbacks)
+        response = self.client.get('/api/properties/categories/tree/')
+        apartment = response.data[1]['children'][0]
+        self.assertEqual(apartment['children'][0]['slug'], 'penthouse')
+
 
 class PropertyModelTest(TestCase):
     """Test Property Model"""
@@ -90,6 +213,114 @@ class PropertyModelTest(TestCase):
         self.assertEqual(prop.slug, 'new-property')
 
 
+class SimilarPropertiesTest(TestCase):
+    """Test k-nearest-neighbour similarity engine"""
+
+    def setUp(self):
+        similarity.reset()
+        self.residential = Category.objects.create(name='Residential', slug='residential')
+        self.villa = Category.objects.create(name='Villa', slug='villa', parent=self.residential)
+        self.apartment = Category.objects.create(name='Apartment', slug='apartment', parent=self.residential)
+
+        self.target = self.create('Target', self.villa, '1000000', 4, 3, 4000, ['Pool', 'Garden'])
+        self.close = self.create('Close', self.villa, '1100000', 4, 3, 4200, ['Pool', 'Garden'])
+        self.sibling = self.create('Sibling', self.apartment, '1000000', 4, 3, 4000, ['Pool'])
+        self.far = self.create('Far', self.apartment, '12000000', 10, 12, 20000, ['Gym'])
+        self.sold = self.create('Sold', self.villa, '1000000', 4, 3, 4000, ['Pool', 'Garden'], status='sold')
+
+    def tearDown(self):
+        similarity.reset()
+
+    def create(self, name, category, price, bedrooms, bathrooms, square_feet, amenities, status='active'):
+        return Property.objects.create(
+            name=name,
+            description='Test',
+            location='Miami',
+            category=category,
+            price=Decimal(price),
+            bedrooms=bedrooms,
+            bathrooms=bathrooms,
+            square_feet=square_feet,
+            amenities=amenities,
+            status=status
+        )
+
+    def test_nearest_neighbours_ranked(self):
+        similar = self.target.get_similar_properties(limit=3)
+        self.assertEqual(similar, [self.close, self.sibling, self.far])
+
+    def test_limit_and_inactive_excluded(self):
+        similar = self.target.get_similar_properties(limit=1)
+        self.assertEqual(similar, [self.close])
+        self.assertNotIn(self.sold, self.close.get_similar_properties(limit=10))
+
+    def test_incremental_update_on_save(self):
+        index = similarity.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            twin = self.create('Twin', self.villa, '1000000', 4, 3, 4000, ['Pool', 'Garden'])
+        # Replays the one changed row
+        with self.assertNumQueries(1):
+            self.assertIs(similarity.get_index(), index)
+        self.assertEqual(similarity.nearest(self.target, 1), [twin.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.status = 'sold'
+            twin.save()
+        self.assertNotIn(twin.pk, similarity.nearest(self.target, 10))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.close.delete()
+        self.assertIs(similarity.get_index(), index)
+        self.assertEqual(similarity.nearest(self.target, 1), [self.sibling.pk])
+
+    def test_uncommitted_writes_not_indexed(self):
+        index = similarity.get_index()
+        twin = self.create('Twin', self.villa, '1000000', 4, 3, 4000, ['Pool', 'Garden'])
+        self.assertIs(similarity.get_index(), index)
+        self.assertNotIn(twin.pk, similarity.nearest(self.target, 10))
+
+    def test_new_amenity_triggers_rebuild(self):
+        index = similarity.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create('Spa', self.villa, '1000000', 4, 3, 4000, ['Spa'])
+        self.assertIsNot(similarity.get_index(), index)
+
+    def test_category_write_and_missing_changes_trigger_rebuild(self):
+        index = similarity.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apartment.name = 'Flat'
+            self.apartment.save()
+        self.assertIsNot(similarity.get_index(), index)
+
+        index = similarity.get_index()
+        version = similarity.publish([self.close.pk])
+        cache.delete(f'property_similarity_change_{version}')
+        self.assertIsNot(similarity.get_index(), index)
+
+    def test_ids_cached_until_catalogue_write(self):
+        with patch('properties.similarity.nearest', return_value=[]) as nearest:
+            self.assertEqual(self.far.get_similar_properties(), [])
+            self.assertEqual(self.far.get_similar_properties(), [])
+            self.assertEqual(nearest.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.close.price = Decimal('12000000')
+                self.close.save()
+            self.far.get_similar_properties()
+            self.assertEqual(nearest.call_count, 2)
+
+    def test_cached_hit_is_single_query(self):
+        self.target.get_similar_properties(limit=1)
+        similarity.reset()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.target.get_similar_properties(limit=1), [self.close])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_similarity_index', stdout=out)
+        self.assertIn('Indexed 4 active properties', out.getvalue())
+
+
 class PropertyAPITest(APITestCase):
     """Test Property API endpoints"""
 
@@ -174,4 +405,1133 @@ class PropertyAPITest(APITestCase):
         }
 
         response = self.client.post('/api/properties/', data)
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    def test_search_properties(self):
+        """Test search by name, location and description"""
+        Property.objects.create(
+            name='Harbour Penthouse',
+            description='Rooftop terrace',
+            location='Sydney',
+            category=self.category,
+            price=Decimal('3000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+
+        response = self.client.get('/api/properties/', {'search': 'sydney'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['slug'] for item in response.data['results']],
+            ['harbour-penthouse']
+        )
+        self.assertNotIn('search_vector', self.client.get(
+            f'/api/properties/{self.property1.slug}/'
+        ).data)
+
+
+class PropertyCursorPaginationTest(APITestCase):
+    """Test keyset pagination over non-unique ordering fields"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        for index in range(7):
+            Property.objects.create(
+                name=f'Villa {index}',
+                description='Test',
+                location='Miami',
+                category=self.category,
+                price=Decimal('1000000') if index % 2 else Decimal('2000000'),
+                bedrooms=3,
+                bathrooms=2
+            )
+
+    def walk(self, url):
+        slugs, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            slugs += [item['slug'] for item in response.data['results']]
+            pages.append(response.data)
+            url = response.data['next']
+        return slugs, pages
+
+    def test_walk_every_ordering(self):
+        for ordering in ['price', '-price', 'created_at', '-name']:
+            slugs, pages = self.walk(
+                f'/api/properties/?pagination=cursor&page_size=3&ordering={ordering}'
+            )
+            self.assertEqual(len(pages), 3)
+            self.assertEqual(sorted(slugs), sorted(Property.objects.values_list('slug', flat=True)))
+
+            tiebreaker = '-id' if ordering.startswith('-') else 'id'
+            expected = list(
+                Property.objects.order_by(ordering, tiebreaker).values_list('slug', flat=True)
+            )
+            self.assertEqual(slugs, expected)
+
+    def test_previous_link(self):
+        _, pages = self.walk('/api/properties/?pagination=cursor&page_size=3&ordering=price')
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual(response.data['results'], pages[1]['results'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/properties/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_cursor_values(self):
+        for cursor in [{'v': 'abc', 'k': 'x'}, {'v': '1000000', 'k': 'x'}, {'v': 'abc', 'k': str(uuid.uuid4())}]:
+            encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('ascii')).decode('ascii')
+            response = self.client.get('/api/properties/', {'pagination': 'cursor', 'ordering': 'price', 'cursor': encoded})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PropertyAmenityFilterTest(APITestCase):
+    """Test amenity filtering and vocabulary"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        for slug, amenities, status_value in [
+            ('pool-gym', ['Pool', 'Gym'], 'active'),
+            ('pool', ['Pool', 'Garden'], 'active'),
+            ('gym', ['Gym'], 'active'),
+            ('none', [], 'active'),
+            ('sold-pool', ['Pool'], 'sold'),
+        ]:
+            Property.objects.create(
+                name=slug,
+                slug=slug,
+                description='Test',
+                location='Miami',
+                category=self.category,
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2,
+                amenities=amenities,
+                status=status_value
+            )
+
+    def slugs(self, params):
+        response = self.client.get('/api/properties/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['slug'] for item in response.data['results'])
+
+    def test_all_of(self):
+        self.assertEqual(self.slugs({'amenities': 'Pool,Gym'}), ['pool-gym'])
+        self.assertEqual(self.slugs({'amenities': 'Pool'}), ['pool', 'pool-gym'])
+
+    def test_any_of(self):
+        self.assertEqual(
+            self.slugs({'amenities': 'Garden, Gym', 'amenities_match': 'any'}),
+            ['gym', 'pool', 'pool-gym']
+        )
+
+    def test_exact_element_match(self):
+        self.assertEqual(self.slugs({'amenities': 'pool'}), [])
+        self.assertEqual(self.slugs({'amenities': 'Poo'}), [])
+        self.assertEqual(self.slugs({'amenities': 'pool,gym', 'amenities_match': 'any'}), [])
+
+    def test_vocabulary(self):
+        response = self.client.get('/api/properties/amenities/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'name': 'Gym', 'count': 2},
+            {'name': 'Pool', 'count': 2},
+            {'name': 'Garden', 'count': 1},
+        ])
+
+
+class PropertyFacetsTest(APITestCase):
+    """Test faceted counts endpoint"""
+
+    def setUp(self):
+        self.villa = Category.objects.create(name='Villa', slug='villa')
+        self.apartment = Category.objects.create(name='Apartment', slug='apartment')
+        for category, price, bedrooms, status_value in [
+            (self.villa, '400000', 3, 'active'),
+            (self.villa, '1500000', 4, 'active'),
+            (self.villa, '1500000', 4, 'active'),
+            (self.apartment, '20000000', 2, 'active'),
+            (self.apartment, '900000', 2, 'sold'),
+        ]:
+            Property.objects.create(
+                name='Property',
+                slug=f'property-{Property.objects.count()}',
+                description='Test',
+                location='Miami',
+                category=category,
+                price=Decimal(price),
+                bedrooms=bedrooms,
+                bathrooms=2,
+                status=status_value
+            )
+
+    def test_facet_counts(self):
+        response = self.client.get('/api/properties/facets/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        facets = response.data
+        self.assertEqual(facets['total'], 4)
+        self.assertEqual(
+            [(item['name'], item['count']) for item in facets['category']],
+            [('Villa', 3), ('Apartment', 1)]
+        )
+        self.assertEqual(facets['bedrooms'], [
+            {'value': 2, 'count': 1},
+            {'value': 3, 'count': 1},
+            {'value': 4, 'count': 2},
+        ])
+        self.assertEqual(facets['status'], [{'value': 'active', 'count': 4}])
+        self.assertEqual(
+            [item['count'] for item in facets['price']],
+            [1, 0, 2, 0, 0, 1]
+        )
+
+    def test_facets_apply_filters(self):
+        response = self.client.get('/api/properties/facets/', {
+            'category': self.villa.id,
+            'min_price': '1000000',
+        })
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['bedrooms'], [{'value': 4, 'count': 2}])
+
+    def test_facets_cached_until_write(self):
+        self.client.get('/api/properties/facets/', {'bedrooms': 4, 'page': 2})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/properties/facets/', {'page': 1, 'bedrooms': 4})
+        self.assertEqual(response.data['total'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Property.objects.filter(bedrooms=4).first().delete()
+        response = self.client.get('/api/properties/facets/', {'bedrooms': 4})
+        self.assertEqual(response.data['total'], 1)
+
+
+class PropertyGeoSearchTest(APITestCase):
+    """Test geohash encoding and radius/viewport filters"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        for slug, latitude, longitude in [
+            ('south-beach', 25.7826, -80.1341),
+            ('brickell', 25.7617, -80.1918),
+            ('fort-lauderdale', 26.1224, -80.1373),
+            ('new-york', 40.7128, -74.0060),
+            ('fiji', -17.7134, 178.0650),
+            ('no-coordinates', None, None),
+        ]:
+            Property.objects.create(
+                name=slug,
+                slug=slug,
+                description='Test',
+                location='Somewhere',
+                latitude=latitude,
+                longitude=longitude,
+                category=self.category,
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2
+            )
+
+    def slugs(self, params):
+        response = self.client.get('/api/properties/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['slug'] for item in response.data['results']]
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(Property.objects.get(slug='new-york').geohash, 'dr5regw3p')
+        self.assertEqual(Property.objects.get(slug='no-coordinates').geohash, '')
+
+    def test_cover_contains_points(self):
+        box = geo.bounding_box(25.7826, -80.1341, 50)
+        prefixes = geo.cover(*box)
+        self.assertLessEqual(len(prefixes), geo.MAX_COVER_CELLS)
+        for slug in ['south-beach', 'brickell', 'fort-lauderdale']:
+            geohash = Property.objects.get(slug=slug).geohash
+            self.assertTrue(any(geohash.startswith(prefix) for prefix in prefixes))
+
+    def test_near_orders_by_distance(self):
+        self.assertEqual(
+            self.slugs({'near': '25.7826,-80.1341', 'radius_km': 10}),
+            ['south-beach', 'brickell']
+        )
+        self.assertEqual(
+            self.slugs({'near': '25.7617,-80.1918', 'radius_km': 50}),
+            ['brickell', 'south-beach', 'fort-lauderdale']
+        )
+
+    def test_bbox(self):
+        self.assertEqual(
+            sorted(self.slugs({'bbox': '-81,25,-80,27'})),
+            ['brickell', 'fort-lauderdale', 'south-beach']
+        )
+        # Viewport crossing the antimeridian
+        self.assertEqual(self.slugs({'bbox': '170,-20,-170,-10'}), ['fiji'])
+
+    def test_invalid_params(self):
+        for params in [{'near': '25.7'}, {'near': '95,0'}, {'bbox': 'a,b,c,d'},
+                       {'near': '25,-80', 'radius_km': '-1'}]:
+            response = self.client.get('/api/properties/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_facets_with_radius(self):
+        response = self.client.get('/api/properties/facets/', {'near': '25.7826,-80.1341'})
+        self.assertEqual(response.data['total'], 2)
+
+
+class PropertyImageVariantTest(APITestCase):
+    """Test responsive image variant pipeline"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        self.settings_override.enable()
+        self.category = Category.objects.create(name='Villa', slug='villa')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def upload(self, name, size=(2000, 1000), mode='RGB'):
+        buffer = BytesIO()
+        Image.new(mode, size).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_property(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Property.objects.create(
+                name='Villa',
+                slug='villa',
+                description='Test',
+                location='Miami',
+                category=self.category,
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2,
+                **kwargs
+            )
+
+    def test_rendered_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            prop = Property.objects.create(
+                name='Villa',
+                slug='villa',
+                description='Test',
+                location='Miami',
+                category=self.category,
+                price=Decimal('1000000'),
+                bedrooms=3,
+                bathrooms=2,
+                featured_image=self.upload('villa.png')
+            )
+            self.assertEqual(prop.featured_image_variants, {})
+        generation = get_generation()
+        for callback in callbacks:
+            callback()
+        self.assertIn('card', prop.featured_image_variants)
+        self.assertGreater(get_generation(), generation)
+
+    def test_variants_rendered_on_upload(self):
+        prop = self.create_property(featured_image=self.upload('villa.png'))
+        prop.refresh_from_db()
+
+        variants = prop.featured_image_variants
+        self.assertEqual(variants['source'], prop.featured_image.name)
+        self.assertEqual((variants['card']['webp']['width'], variants['card']['webp']['height']), (640, 320))
+        self.assertEqual(variants['hero']['jpeg']['width'], 1600)
+        with Image.open(prop.featured_image.storage.path(variants['thumbnail']['webp']['name'])) as image:
+            self.assertEqual((image.format, image.width), ('WEBP', 320))
+
+    def test_small_images_not_upscaled(self):
+        prop = self.create_property()
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PropertyImage.objects.create(
+                property=prop,
+                image=self.upload('small.png', size=(400, 300), mode='RGBA')
+            )
+        self.assertEqual(image.image_variants['hero']['jpeg']['width'], 400)
+        self.assertEqual(image.image_variants['thumbnail']['jpeg']['width'], 320)
+
+    def test_serializers_return_requested_size(self):
+        prop = self.create_property(featured_image=self.upload('villa.png'))
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyImage.objects.create(property=prop, image=self.upload('gallery.png'))
+
+        response = self.client.get('/api/properties/', {'image_size': 'card'})
+        self.assertTrue(response.data['results'][0]['featured_image'].endswith('villa_card.webp'))
+
+        response = self.client.get(f'/api/properties/{prop.slug}/', {
+            'image_size': 'thumbnail',
+            'image_format': 'jpeg',
+        })
+        self.assertTrue(response.data['featured_image'].endswith('villa_thumbnail.jpeg'))
+        self.assertTrue(response.data['images'][0]['image'].endswith('gallery_thumbnail.jpeg'))
+
+        response = self.client.get('/api/properties/')
+        self.assertTrue(response.data['results'][0]['featured_image'].endswith('villa.png'))
+
+    def test_replacing_image_replaces_variants(self):
+        prop = self.create_property(featured_image=self.upload('villa.png'))
+        old_card = prop.featured_image_variants['card']['webp']['name']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.featured_image = self.upload('new.png')
+            prop.save()
+        self.assertTrue(prop.featured_image_variants['card']['webp']['name'].startswith('properties/new_card'))
+        self.assertFalse(prop.featured_image.storage.exists(old_card))
+
+    def test_failed_render_not_retried(self):
+        with patch('properties.images.generate_variants', side_effect=OSError('corrupt')) as generate_variants, \
+                self.assertLogs('properties.images', 'ERROR'):
+            prop = self.create_property(featured_image=self.upload('villa.png'))
+            with self.captureOnCommitCallbacks(execute=True):
+                prop.price = Decimal('900000')
+                prop.save()
+        self.assertEqual(generate_variants.call_count, 1)
+        prop.refresh_from_db()
+        self.assertEqual(prop.featured_image_variants, {'source': prop.featured_image.name})
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1)
+    def test_process_pool(self):
+        rendered = images.render_variants(self.upload('villa.png').read())
+        self.assertEqual(rendered['hero']['webp'][1:], (1600, 800))
+
+    @override_settings(IMAGE_VARIANT_WORKERS=1)
+    def test_rendered_off_the_request_thread(self):
+        with patch('properties.images._get_renderer') as get_renderer, \
+                patch('properties.images.refresh_variants') as refresh_variants:
+            prop = self.create_property(featured_image=self.upload('villa.png'))
+        self.assertFalse(refresh_variants.called)
+        get_renderer.return_value.submit.assert_called_once_with(
+            images._refresh_stored, Property, prop.pk, 'featured_image', 'featured_image_variants'
+        )
+
+
+class PropertyConditionalGetTest(APITestCase):
+    """Test ETag / Last-Modified revalidation"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        self.property = Property.objects.create(
+            name='Villa 1',
+            slug='villa-1',
+            description='Test',
+            location='Miami',
+            category=self.category,
+            price=Decimal('1000000'),
+            bedrooms=4,
+            bathrooms=3
+        )
+
+    def test_detail_not_modified(self):
+        url = f'/api/properties/{self.property.slug}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with patch.object(Property, 'get_similar_properties') as get_similar:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertFalse(get_similar.called)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    @patch('properties.images.generate_variants', return_value={})
+    def test_detail_changes_with_images_and_updates(self, generate_variants):
+        url = f'/api/properties/{self.property.slug}/'
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyImage.objects.create(property=self.property, image='properties/gallery/a.jpg')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.price = Decimal('900000')
+            self.property.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        response = self.client.get('/api/properties/', {'ordering': 'price'})
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        response = self.client.get('/api/properties/', {'ordering': 'price'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get('/api/properties/', {'ordering': '-price'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.status = 'sold'
+            self.property.save()
+        response = self.client.get('/api/properties/', {'ordering': 'price'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_list_deletion_not_hidden_by_if_modified_since(self):
+        other = Property.objects.create(
+            name='Villa 2',
+            slug='villa-2',
+            description='Test',
+            location='Miami',
+            category=self.category,
+            price=Decimal('2000000'),
+            bedrooms=4,
+            bathrooms=3
+        )
+        since = http_date(self.property.updated_at.timestamp() + 60)
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        response = self.client.get('/api/properties/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['slug'] for item in response.data['results']], ['villa-1'])
+
+
+class PropertyResponseCacheTest(APITestCase):
+    """Test anonymous response cache and generation invalidation"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='admin123',
+            user_type='admin'
+        )
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        self.property = Property.objects.create(
+            name='Villa 1',
+            slug='villa-1',
+            description='Test',
+            location='Miami',
+            category=self.category,
+            price=Decimal('1000000'),
+            bedrooms=4,
+            bathrooms=3
+        )
+
+    def test_anonymous_hits_skip_database(self):
+        for url in ['/api/properties/?ordering=price', f'/api/properties/{self.property.slug}/']:
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+            with self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(IMAGE_VARIANT_WORKERS=0)
+    @patch('properties.images.generate_variants', return_value={})
+    def test_writes_invalidate(self, generate_variants):
+        url = f'/api/properties/{self.property.slug}/'
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PropertyImage.objects.create(property=self.property, image='properties/gallery/a.jpg')
+        self.assertEqual(len(self.client.get(url).data['images']), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Mansion'
+            self.category.save()
+        self.assertEqual(self.client.get(url).data['category']['name'], 'Mansion')
+
+    def test_list_revalidation_runs_no_query(self):
+        self.client.force_authenticate(user=self.admin)
+        etag = self.client.get('/api/properties/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/properties/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_admin_bypasses_cache(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get('/api/properties/')
+        Property.objects.filter(pk=self.property.pk).update(status='sold')
+        response = self.client.get('/api/properties/')
+        self.assertEqual(response.data['results'][0]['status'], 'sold')
+
+
+class PropertySparseFieldsetTest(APITestCase):
+    """Test ?fields= / ?omit= / ?expand= on property serializers"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Villa', slug='villa')
+        self.property = Property.objects.create(
+            name='Villa 1',
+            slug='villa-1',
+            description='Test',
+            location='Miami',
+            category=self.category,
+            price=Decimal('1000000'),
+            bedrooms=4,
+            bathrooms=3
+        )
+
+    def test_list_fields(self):
+        response = self.client.get('/api/properties/', {'fields': 'slug,price'})
+        self.assertEqual(response.data['results'], [{'slug': 'villa-1', 'price': '1000000.00'}])
+
+    def test_empty_fields_is_absent(self):
+        default = self.client.get('/api/properties/').data['results']
+        for params in ({'fields': ''}, {'fields': ' , '}, {'omit': ''}):
+            self.assertEqual(self.client.get('/api/properties/', params).data['results'], default)
+
+    def test_list_skips_category_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/properties/', {'omit': 'category_name', 'page_size': 5})
+        self.assertFalse(any('categories' in query['sql'] for query in queries.captured_queries))
+
+    def test_other_actions_skip_image_prefetch(self):
+        slug = self.property.slug
+        for url, params in [
+            (f'/api/properties/{slug}/similar/', {}),
+            (f'/api/properties/{slug}/check_availability/', {'start_date': '2030-01-01', 'end_date': '2030-01-05'}),
+            ('/api/properties/facets/', {}),
+        ]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse(any('property_images' in query['sql'] for query in queries.captured_queries), url)
+
+    def test_detail_nested_fields_and_method_fields_skipped(self):
+        with patch.object(Property, 'get_similar_properties') as get_similar:
+            response = self.client.get(
+                f'/api/properties/{self.property.slug}/',
+                {'fields': 'name,category.name,images'}
+            )
+            self.assertFalse(get_similar.called)
+        self.assertEqual(response.data, {'name': 'Villa 1', 'category': {'name': 'Villa'}, 'images': []})
+
+    def test_detail_omit_nested(self):
+        response = self.client.get(
+            f'/api/properties/{self.property.slug}/',
+            {'omit': 'similar_properties,category.path,category.children_count'}
+        )
+        self.assertNotIn('similar_properties', response.data)
+        self.assertNotIn('path', response.data['category'])
+        self.assertEqual(response.data['category']['slug'], 'villa')
+
+    def test_detail_expand(self):
+        response = self.client.get(
+            f'/api/properties/{self.property.slug}/',
+            {'fields': 'category,images', 'expand': 'images'}
+        )
+        self.assertEqual(response.data, {'category': self.category.pk, 'images': []})
+
+
+class PropertyValuesSerializationTest(APITestCase):
+    """Test the values() list path renders the same JSON as the serializers"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        self.settings_override.enable()
+        category = Category.objects.create(name='Villa', slug='villa')
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400)).save(buffer, 'PNG')
+        Property.objects.create(
+            name='Villa 1',
+            slug='villa-1',
+            description='Test',
+            location='Miami',
+            category=category,
+            price=Decimal('1250000.50'),
+            bedrooms=4,
+            bathrooms=3,
+            latitude=25.76,
+            longitude=-80.19,
+            featured_image=SimpleUploadedFile('villa.png', buffer.getvalue(), content_type='image/png')
+        )
+        Property.objects.create(
+            name='Plot',
+            slug='plot',
+            description='No category, no image',
+            location='Austin',
+            price=Decimal('90000'),
+            bedrooms=0,
+            bathrooms=0
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def get_content(self, params, enabled):
+        cache.clear()
+        with self.settings(VALUES_LIST_SERIALIZATION=enabled):
+            response = self.client.get('/api/properties/', params, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content
+
+    def test_identical_json(self):
+        for params in (
+            {},
+            {'ordering': 'price'},
+            {'image_size': 'card'},
+            {'image_size': 'hero', 'image_format': 'jpeg'},
+            {'fields': 'slug,featured_image,category_name', 'search': 'villa'},
+            {'near': '25.7,-80.2', 'radius_km': 50},
+        ):
+            self.assertEqual(self.get_content(params, False), self.get_content(params, True), params)
+
+    def test_no_model_instances(self):
+        with patch.object(Property, 'from_db', side_effect=AssertionError):
+            self.get_content({}, True)
+
+    def test_cursor_pagination_falls_back(self):
+        params = {'pagination': 'cursor', 'page_size': 1}
+        self.assertEqual(self.get_content(params, False), self.get_content(params, True))
+
+
+class ImportPropertiesCommandTest(TestCase):
+    """Test the streaming bulk property importer"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        residential = Category.objects.create(name='Residential', slug='residential')
+        self.villas = Category.objects.create(name='Villas', slug='villas', parent=residential)
+        self.existing = Property.objects.create(
+            name='Villa',
+            slug='villa',
+            description='Existing',
+            location='Miami',
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        similarity.reset()
+
+    def write(self, name, content):
+        path = f'{self.directory}/{name}'
+        with open(path, 'w') as source:
+            source.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_properties', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import(self):
+        path = self.write('properties.csv', (
+            'name,description,location,category,price,bedrooms,bathrooms,amenities,latitude,longitude\n'
+            'Villa,Sea view,Miami,Residential/Villas,2500000,5,4,pool|garden,25.76,-80.19\n'
+            'Villa,Lake view,Orlando,residential/villas,900000,3,2,,,\n'
+            'Loft,City,New York,Commercial/Lofts,700000,1,1,"[""gym""]",,\n'
+        ))
+        out, err = self.run_import(path, '--batch-size', '2')
+
+        self.assertIn('2 created, 0 updated, 1 skipped', out)
+        self.assertIn('Row 3 skipped: category: Unknown category "Commercial/Lofts"', err)
+        sea_view = Property.objects.get(slug='villa-2')
+        self.assertEqual(sea_view.category, self.villas)
+        self.assertEqual(sea_view.amenities, ['pool', 'garden'])
+        self.assertEqual(sea_view.geohash, geo.encode(25.76, -80.19))
+        self.assertEqual(Property.objects.get(slug='villa-3').location, 'Orlando')
+
+    def test_import_publishes_similarity_index(self):
+        index = similarity.get_index()
+        path = self.write('properties.csv', (
+            'name,description,location,price,bedrooms,bathrooms\n'
+            'Penthouse,Sky,Miami,4000000,4,4\n'
+        ))
+        self.run_import(path)
+        self.assertIsNot(similarity.get_index(), index)
+        self.assertEqual(len(similarity.get_index().ids), 2)
+
+    def test_ndjson_updates_and_creates_categories(self):
+        path = self.write('properties.ndjson', '\n'.join([
+            '{"slug": "villa", "price": "1200000.00", "latitude": 40.7, "longitude": -74.0}',
+            '{"name": "Loft", "description": "City", "location": "New York", "category": "Commercial/Lofts",'
+            ' "price": 700000, "bedrooms": 1, "bathrooms": 1, "amenities": ["gym"]}',
+            '{"name": "Broken", "price": "lots"}',
+            'not json',
+        ]))
+        out, err = self.run_import(path, '--create-categories')
+
+        self.assertIn('1 created, 1 updated, 2 skipped', out)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, Decimal('1200000.00'))
+        self.assertEqual(self.existing.description, 'Existing')
+        self.assertEqual(self.existing.geohash, geo.encode(40.7, -74.0))
+        loft = Property.objects.get(slug='loft')
+        self.assertEqual(loft.category.get_path(), 'Commercial > Lofts')
+        self.assertIn('Row 4 skipped: invalid JSON', err)
+
+    def test_resume_after_failed_batch(self):
+        rows = '\n'.join(
+            f'{{"name": "Home {i}", "description": "Test", "location": "Miami", '
+            f'"price": 100000, "bedrooms": 2, "bathrooms": 1}}'
+            for i in range(5)
+        )
+        path = self.write('properties.ndjson', rows)
+        bulk_create = Property.objects.bulk_create
+        calls = []
+
+        def fail_second_batch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise DatabaseError('connection lost')
+            return bulk_create(*args, **kwargs)
+
+        with patch.object(Property.objects, 'bulk_create', side_effect=fail_second_batch):
+            with self.assertRaisesMessage(CommandError, 'continue from row 3'):
+                self.run_import(path, '--batch-size', '2')
+        self.assertEqual(Property.objects.filter(name__startswith='Home').count(), 2)
+
+        out, _ = self.run_import(path, '--batch-size', '2', '--resume')
+        self.assertIn('Resuming after row 2', out)
+        self.assertIn('Imported 5 rows: 5 created', out)
+        self.assertEqual(Property.objects.filter(name__startswith='Home').count(), 5)
+        self.assertFalse(os.path.exists(f'{path}.import-progress'))
+
+
+class PropertyExportTest(APITestCase):
+    """Test streaming CSV / NDJSON exports"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin',
+            email='admin@test.com',
+            password='admin123',
+            user_type='admin'
+        )
+        category = Category.objects.create(name='Villa', slug='villa')
+        for i, (location, status_value) in enumerate([('Miami', 'active'), ('Austin', 'sold'), ('Miami', 'inactive')]):
+            Property.objects.create(
+                name=f'Villa {i}',
+                slug=f'villa-{i}',
+                description='Test',
+                location=location,
+                category=category,
+                price=Decimal('1000000') * (i + 1),
+                bedrooms=3,
+                bathrooms=2,
+                amenities=['Pool', 'Gym'],
+                status=status_value
+            )
+
+    def export(self, params):
+        response = self.client.get('/api/properties/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_with_filters(self):
+        self.client.force_authenticate(user=self.admin)
+        response, content = self.export({'search': 'Miami', 'ordering': '-price'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="properties-', response['Content-Disposition'])
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('id,name,slug,category_name,location,'))
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Villa 2', 'Villa 0'])
+        self.assertIn(',3000000.00,3,2,,"[""Pool"", ""Gym""]",inactive,', lines[1])
+
+    def test_ndjson(self):
+        self.client.force_authenticate(user=self.admin)
+        response, content = self.export({'format': 'ndjson', 'status': 'sold'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['slug'], 'villa-1')
+        self.assertEqual(rows[0]['price'], '2000000.00')
+        self.assertEqual(rows[0]['amenities'], ['Pool', 'Gym'])
+
+    def test_admin_only(self):
+        response = self.client.get('/api/properties/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        customer = User.objects.create_user(username='customer', email='customer@test.com', password='test123')
+        self.client.force_authenticate(user=customer)
+        response = self.client.get('/api/properties/export/', {'format': 'ndjson'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+@patch.object(EstimatedCountPagination, 'page_size', 2)
+class EstimatedCountPaginationTest(APITestCase):
+    """Test exact, estimated and skipped counts in page-number pagination"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            Property.objects.create(
+                name=f'Villa {i}',
+                slug=f'villa-{i}',
+                description='Test',
+                location='Miami',
+                price=Decimal('1000000') + i,
+                bedrooms=3,
+                bathrooms=2
+            )
+
+    def test_exact_count_below_threshold(self):
+        response = self.client.get('/api/properties/')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['count_type'], 'exact')
+        self.assertIn('page=2', response.data['next'])
+
+    @patch('properties.pagination.estimate_count', return_value=250000)
+    def test_estimated_count(self, estimate):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/properties/', {'page': 2, 'ordering': 'price'})
+        self.assertEqual(response.data['count'], 250000)
+        self.assertEqual(response.data['count_type'], 'estimated')
+        self.assertEqual([row['name'] for row in response.data['results']], ['Villa 2'])
+        self.assertIsNone(response.data['next'])
+        self.assertIn('properties/?ordering=price', response.data['previous'])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.get('/api/properties/', {'page': 3})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @patch('properties.pagination.estimate_count')
+    def test_count_false(self, estimate):
+        # Only the page itself: neither pagination nor the ETag counts rows
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get('/api/properties/', {'count': 'false', 'ordering': 'price'})
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(estimate.called)
+        self.assertIsNone(response.data['count'])
+        self.assertIsNone(response.data['count_type'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIn('page=2', response.data['next'])
+
+
+class BenchmarkApiCommandTest(TestCase):
+    """Test the endpoint benchmark suite and its baseline comparison"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.baseline = f'{self.directory}/baseline.json'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def benchmark(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'benchmark_api', '--baseline', self.baseline, '--properties', '10', '--users', '3',
+            '--iterations', '3', '--warmup', '1', *args, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_baseline_round_trip(self):
+        out, _ = self.benchmark('--save', '--only', 'property-detail', 'booking-list', 'payment-confirm')
+        self.assertIn('Baseline saved', out)
+        with open(self.baseline) as source:
+            baseline = json.load(source)
+        self.assertEqual(set(baseline['endpoints']), {'property-detail', 'booking-list', 'payment-confirm'})
+        self.assertEqual(baseline['endpoints']['booking-list']['requests'], 3)
+        # The run, generated dataset included, is rolled back
+        self.assertFalse(Property.objects.exists())
+
+        out, _ = self.benchmark('--only', 'booking-list', '--threshold', '100', '--min-delta-ms', '1000')
+        self.assertIn('No regressions', out)
+
+        baseline['endpoints']['booking-list']['queries'] -= 1
+        with open(self.baseline, 'w') as source:
+            json.dump(baseline, source)
+        with self.assertRaisesMessage(CommandError, '1 regression(s)'):
+            self.benchmark('--only', 'booking-list', '--threshold', '100', '--min-delta-ms', '1000')
+
+    def test_wildcard_allowed_hosts(self):
+        for allowed_hosts in (['*'], ['.example.com']):
+            with override_settings(ALLOWED_HOSTS=allowed_hosts):
+                out, _ = self.benchmark('--only', 'property-list')
+            self.assertIn('property-list', out)
+
+    def test_rolled_back_run_leaves_no_reachable_cache(self):
+        seen = []
+        load_fixtures = BenchmarkCommand.load_fixtures
+
+        def record_generations(command):
+            load_fixtures(command)
+            seen.append((get_generation(), get_generation(BOOKINGS), similarity.get_index()))
+
+        with patch.object(BenchmarkCommand, 'load_fixtures', record_generations):
+            self.benchmark('--only', 'property-list', 'booking-create')
+        catalogue, bookings, index = seen[0]
+        self.assertGreater(get_generation(), catalogue)
+        self.assertGreater(get_generation(BOOKINGS), bookings)
+        self.assertGreater(get_generation(similarity.INDEX_GENERATION), index.version)
+
+
+class PropertyCalendarTest(APITestCase):
+    """Test the availability calendar and its ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@test.com', password='test123')
+        self.property = self.make_property('villa')
+        self.other = self.make_property('other-villa')
+        self.start = date(2030, 5, 1)
+
+    def make_property(self, slug):
+        return Property.objects.create(
+            name=slug.title(),
+            slug=slug,
+            description='Test',
+            location='Miami',
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+
+    def book(self, prop, day, visit_time=None, booking_status='pending'):
+        booking = Booking(
+            user=self.user,
+            property=prop,
+            visit_date=self.start + timedelta(days=day),
+            visit_time=visit_time,
+            status=booking_status
+        )
+        booking.calculate_amounts()
+        booking.save()
+        return booking
+
+    def calendar(self, **headers):
+        return self.client.get(
+            '/api/properties/villa/calendar/',
+            {'from': self.start.isoformat(), 'to': (self.start + timedelta(days=30)).isoformat()},
+            **headers
+        )
+
+    def test_blocked_days(self):
+        self.book(self.property, 2, time(14))
+        self.book(self.property, 2, time(10), 'paid')
+        self.book(self.property, 5)
+        self.book(self.property, 7, booking_status='canceled')
+        self.book(self.property, 40)
+        self.book(self.other, 3)
+
+        with self.assertNumQueries(2):
+            response = self.calendar()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['blocked'], [
+            {'date': date(2030, 5, 3), 'all_day': False, 'times': [time(10), time(14)]},
+            {'date': date(2030, 5, 6), 'all_day': True, 'times': []},
+        ])
+        self.assertEqual(response.json()['blocked'][0]['times'], ['10:00:00', '14:00:00'])
+
+    def test_range_validation(self):
+        url = '/api/properties/villa/calendar/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['to'] - response.data['from'], timedelta(days=30))
+
+        for params in ({'from': 'May 1'}, {'from': '2030-02-30'}, {'from': '2030-05-02', 'to': '2030-05-01'},
+                       {'from': '2030-01-01', 'to': '2031-01-02'}):
+            self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_etag_follows_own_bookings(self):
+        etag = self.calendar()['ETag']
+
+        # Revalidation reads the property and the cached generation only
+        with self.assertNumQueries(1):
+            response = self.calendar(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.other, 1)
+        self.assertEqual(self.calendar(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = self.book(self.property, 60)
+            # Not before commit: a calendar read now would be cached under the new ETag
+            self.assertEqual(self.calendar(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.calendar(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.update_status('canceled')
+        self.assertEqual(self.calendar(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class PropertyAvailabilityFilterTest(APITestCase):
+    """Test ?available_from=&available_to= filtering"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', email='buyer@test.com', password='test123')
+        self.day = date(2030, 5, 1)
+        self.pending = self.make_property('pending', 0, 'pending')
+        self.paid = self.make_property('paid', 2, 'paid')
+        self.canceled = self.make_property('canceled', 0, 'canceled')
+        self.free = self.make_property('free')
+
+    def make_property(self, slug, day=None, booking_status=None):
+        prop = Property.objects.create(
+            name=slug.title(),
+            slug=slug,
+            description='Test',
+            location='Miami',
+            price=Decimal('1000000'),
+            bedrooms=3,
+            bathrooms=2
+        )
+        if booking_status:
+            self.book(prop, day, booking_status)
+        return prop
+
+    def book(self, prop, day, booking_status='pending'):
+        booking = Booking(
+            user=self.user,
+            property=prop,
+            visit_date=self.day + timedelta(days=day),
+            status=booking_status
+        )
+        booking.calculate_amounts()
+        booking.save()
+
+    def slugs(self, **params):
+        response = self.client.get('/api/properties/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['slug'] for item in response.data['results'])
+
+    def test_excludes_blocking_bookings(self):
+        self.assertEqual(self.slugs(available_from='2030-05-01'), ['canceled', 'free', 'paid'])
+        self.assertEqual(self.slugs(available_to='2030-05-03'), ['canceled', 'free', 'pending'])
+        self.assertEqual(
+            self.slugs(available_from='2030-05-01', available_to='2030-05-03'), ['canceled', 'free']
+        )
+        self.assertEqual(self.slugs(available_from='2030-05-04', available_to='2030-05-10'),
+                         ['canceled', 'free', 'paid', 'pending'])
+
+    def test_single_anti_join(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.slugs(available_from='2030-05-01', available_to='2030-05-03')
+        booking_queries = [query['sql'] for query in queries if '"bookings"' in query['sql']]
+        self.assertTrue(booking_queries)
+        for sql in booking_queries:
+            self.assertIn('NOT EXISTS', sql)
+            self.assertTrue(sql.lstrip().startswith('SELECT'))
+            self.assertIn('FROM "properties"', sql)
+
+    def test_new_booking_invalidates_cached_list(self):
+        self.assertEqual(self.slugs(available_from='2030-05-10'), ['canceled', 'free', 'paid', 'pending'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.free, 9)
+        self.assertEqual(self.slugs(available_from='2030-05-10'), ['canceled', 'paid', 'pending'])
+
+    def test_invalid_dates(self):
+        for params in ({'available_from': 'tomorrow'}, {'available_to': '2030-13-01'},
+                       {'available_from': '2030-05-03', 'available_to': '2030-05-01'}):
+            response = self.client.get('/api/properties/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from .serializers import VariantImageField
+
+
+# Converter result for fields DRF leaves out of the row (SkipField)
+SKIP = object()
+
+
+class ValuesNotSupported(Exception):
+    """The serializer has a field that cannot be rendered from values() rows"""
+
+
+class RowObject:
+    """Attribute access to one model's columns inside a values() row.
+
+    Stands in for the instance behind FieldFiles and SerializerMethodFields,
+    so those may only read the model's own columns.
+    """
+    __slots__ = ('row', 'prefix')
+
+    def __init__(self, row, prefix=''):
+        self.row = row
+        self.prefix = prefix
+
+    def __getattr__(self, name):
+        try:
+            return self.row[self.prefix + name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class ValuesSerializer:
+    """Read-only twin of a ModelSerializer working on QuerySet.values() rows.
+
+    The (already pruned) serializer is compiled once into one converter per
+    field; each converter reuses the field's own to_representation(), so the
+    rendered JSON is identical to the serializer's, without building model
+    instances or walking DRF's attribute lookups per row. Many-related
+    fields raise ValuesNotSupported and callers fall back to the serializer.
+    """
+
+    def __init__(self, serializer):
+        self.lookups = []
+        self.plan = self.compile(serializer, '')
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def render(self, rows):
+        return [self.render_row(self.plan, row) for row in rows]
+
+    @staticmethod
+    def render_row(plan, row):
+        data = {name: convert(row) for name, convert in plan}
+        if SKIP in data.values():
+            data = {name: value for name, value in data.items() if value is not SKIP}
+        return data
+
+    def lookup(self, path):
+        if path not in self.lookups:
+            self.lookups.append(path)
+        return path
+
+    def compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            plan.append((name, self.compile_field(field, model, prefix)))
+        return plan
+
+    def compile_field(self, field, model, prefix):
+        if isinstance(field, serializers.SerializerMethodField):
+            for model_field in model._meta.concrete_fields:
+                self.lookup(prefix + model_field.name)
+            method = getattr(field.parent, field.method_name)
+            return lambda row: method(RowObject(row, prefix))
+
+        if isinstance(field, (serializers.ListSerializer, ManyRelatedField)) or field.source == '*':
+            raise ValuesNotSupported(field.field_name)
+
+        path = self.lookup(prefix + '__'.join(field.source_attrs))
+
+        if isinstance(field, serializers.ModelSerializer):
+            nested = self.compile(field, path + '__')
+            render_row = self.render_row
+            return lambda row: None if row[path] is None else render_row(nested, row)
+
+        if isinstance(field, PrimaryKeyRelatedField):
+            # values() already yields the key to_representation() would return
+            return lambda row: row[path]
+
+        if isinstance(field, serializers.FileField):
+            if len(field.source_attrs) != 1:
+                raise ValuesNotSupported(field.field_name)
+            model_field = model._meta.get_field(field.source_attrs[0])
+            if isinstance(field, VariantImageField):
+                self.lookup(prefix + field.variants_field)
+            to_representation = field.to_representation
+            return lambda row: (
+                to_representation(FieldFile(RowObject(row, prefix), model_field, row[path]))
+                if row[path] else None
+            )
+
+        if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone'):
+            # Resolve the active timezone once instead of on every row
+            field.timezone = field.default_timezone()
+        to_representation = field.to_representation
+        convert = lambda row: None if row[path] is None else to_representation(row[path])
+        if len(field.source_attrs) == 1:
+            return convert
+
+        # 'category.name' through a null category: DRF's attribute lookup
+        # fails and the field falls back to its default, null, or is skipped
+        if field.default is not empty:
+            missing = field.get_default
+        elif field.allow_null:
+            missing = lambda: None
+        elif not field.required:
+            missing = lambda: SKIP
+        else:
+            raise ValuesNotSupported(field.field_name)
+        relations = [
+            self.lookup(prefix + '__'.join(field.source_attrs[:depth]))
+            for depth in range(1, len(field.source_attrs))
+        ]
+        return lambda row: (
+            missing() if any(row[relation] is None for relation in relations)
+            else convert(row)
+        )
+
+
+class ValuesListMixin:
+    """Serve list actions from values() rows when VALUES_LIST_SERIALIZATION is on.
+
+    Opt-in per deployment; any serializer the compiler cannot handle, and
+    views whose use_values_serializer() says no, keep the regular path.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def use_values_serializer(self):
+        return settings.VALUES_LIST_SERIALIZATION
+
+    def list_response(self, queryset):
+        values = None
+        if self.use_values_serializer():
+            try:
+                values = ValuesSerializer(self.get_serializer())
+            except ValuesNotSupported:
+                pass
+
+        if values is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        queryset = values.values(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values.render(page))
+        return Response(values.render(queryset))
@@ -1,14 +1,35 @@
 from rest_framework import viewsets, filters, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
 from django_filters.rest_framework import DjangoFilterBackend
+from bookings.models import Booking
+from .cache import BOOKINGS, bookings_of, get_generation
+from .export import ExportMixin
+from .filters import (
+    PropertyAvailabilityFilter, PropertyGeoFilter, PropertySearchFilter, filter_amenities, property_facets,
+    query_date,
+)
+from .mixins import ConditionalGetMixin
 from .models import Category, Property
+from .pagination import KeysetPagination
+from .values_serializer import ValuesListMixin
 from .serializers import (
+    SparseFieldset,
     CategorySerializer,
     PropertyListSerializer,
     PropertyDetailSerializer,
     PropertyCreateUpdateSerializer
 )
+from datetime import date, datetime, timedelta, timezone
+from django.utils.http import parse_http_date
+import hashlib
+import json
+
+CALENDAR_DEFAULT_DAYS = 31
+CALENDAR_MAX_DAYS = 366
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -28,30 +49,150 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
-    """Category CRUD with DFS traversal"""
-    queryset = Category.objects.all()
+    """Category CRUD with materialized-path tree queries"""
+    queryset = Category.objects.annotate(num_children=Count('children'))
     serializer_class = CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = 'slug'
 
     @action(detail=True, methods=['get'])
     def children(self, request, slug=None):
-        """Get all descendant categories using DFS"""
+        """Get all descendant categories in one query"""
         category = self.get_object()
-        children = category.get_all_children()
+        children = category.get_descendants().annotate(num_children=Count('children'))
         serializer = self.get_serializer(children, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Whole category hierarchy with direct and descendant property counts"""
+        return Response(Category.get_tree())
+
 
-class PropertyViewSet(viewsets.ModelViewSet):
+class PropertyViewSet(ConditionalGetMixin, ValuesListMixin, ExportMixin, viewsets.ModelViewSet):
     """Property CRUD operations"""
-    queryset = Property.objects.select_related('category').prefetch_related('images')
+    queryset = Property.objects.all()
     permission_classes = [IsAdminOrReadOnly]
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend,
+        PropertySearchFilter,
+        PropertyGeoFilter,
+        PropertyAvailabilityFilter,
+        filters.OrderingFilter,
+    ]
     filterset_fields = ['status', 'category', 'bedrooms', 'bathrooms']
     search_fields = ['name', 'description', 'location']
     ordering_fields = ['price', 'created_at', 'name']
+    export_name = 'properties'
+    export_fields = (
+        'id', 'name', 'slug', 'category__name', 'location', 'latitude', 'longitude',
+        'price', 'bedrooms', 'bathrooms', 'square_feet', 'amenities', 'status',
+        'created_at', 'updated_at',
+    )
+
+    # Upper edges of the price facet buckets; the last bucket is open-ended
+    price_buckets = (500000, 1000000, 2000000, 5000000, 10000000)
+    # Query parameters that never change which rows match
+    non_filter_params = ('page', 'page_size', 'ordering', 'cursor', 'pagination', 'format')
+
+    @property
+    def paginator(self):
+        """Keyset pagination on request (?pagination=cursor), page numbers otherwise"""
+        request = getattr(self, 'request', None)
+        if not hasattr(self, '_paginator') and request is not None and (
+            request.query_params.get('pagination') == 'cursor' or
+            KeysetPagination.cursor_query_param in request.query_params
+        ):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, self.build_list)
+
+    def use_values_serializer(self):
+        # Keyset cursors are built from model attributes, not values() rows
+        return super().use_values_serializer() and not isinstance(self.paginator, KeysetPagination)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, self.build_detail)
+
+    def cached_response(self, request, build):
+        """Serve non-admin list/detail GETs from the response cache.
+
+        Keys hold the catalogue generation, which Property, PropertyImage and
+        Category writes bump (plus the bookings generation for availability
+        filters), so stale entries are never looked up again and no pattern
+        deletes are needed. Admins see inactive rows and bypass it.
+        """
+        if self._is_admin():
+            return build(request)
+
+        params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+        fingerprint = json.dumps([
+            self.action, self.kwargs.get(self.lookup_field),
+            request.build_absolute_uri('/'), params
+        ])
+        cache_key = (
+            f'property_response_{self.generations()}_'
+            f'{hashlib.md5(fingerprint.encode()).hexdigest()}'
+        )
+
+        cached = cache.get(cache_key)
+        if cached is None:
+            response = build(request)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(cache_key, {
+                    'data': response.data,
+                    'etag': response['ETag'],
+                    'last_modified': response.get('Last-Modified'),
+                }, settings.PROPERTY_RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        etag, last_modified = cached['etag'], cached['last_modified']
+        if last_modified:
+            last_modified = datetime.fromtimestamp(parse_http_date(last_modified), tz=timezone.utc)
+        response = self.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        return self.set_validators(Response(cached['data']), etag, last_modified)
+
+    def build_list(self, request):
+        """List with an ETag from the generations and the normalized query.
+
+        Every write that can change a list bumps a generation, so no query
+        runs before a 304 and the paginator stays the only one to count rows.
+        No Last-Modified: deleting a row would not move it forward.
+        """
+        params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+        etag = self.make_etag('list', self.generations(), self._is_admin(), json.dumps(params))
+        response = self.not_modified(request, etag)
+        if response is not None:
+            return response
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.set_validators(self.list_response(queryset), etag)
+
+    def build_detail(self, request):
+        """Detail with ETag/Last-Modified from updated_at and the image set"""
+        instance = self.get_object()
+
+        gallery = []
+        if SparseFieldset.from_request(request).wants('images'):
+            gallery = list(instance.images.all())
+        images = [(image.pk, image.image.name, image.caption, image.order) for image in gallery]
+        last_modified = max([instance.updated_at] + [image.created_at for image in gallery])
+        # The generation covers embedded data: category and similar properties
+        etag = self.make_etag(
+            'detail', instance.pk, instance.updated_at.isoformat(), images,
+            self.generations(), request.query_params.urlencode()
+        )
+        response = self.not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -66,6 +207,29 @@ class PropertyViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
 
+    def with_related(self, queryset):
+        """Join/prefetch only what the serializer will render (see ?fields=)"""
+        if self.action == 'list':
+            if SparseFieldset.from_request(self.request).wants('category_name'):
+                queryset = queryset.select_related('category')
+            return queryset
+        if self.action != 'retrieve':
+            # Other actions never render PropertyDetailSerializer from this queryset
+            return queryset
+
+        fieldset = SparseFieldset.from_request(self.request)
+        if fieldset.wants('category') and fieldset.expands('category'):
+            queryset = queryset.select_related('category')
+        if fieldset.wants('images'):
+            queryset = queryset.prefetch_related('images')
+        return queryset
+
+    def generations(self):
+        """Generations the response depends on: bookings too when filtered by availability"""
+        if PropertyAvailabilityFilter.is_applied(self.request):
+            return f'{get_generation()}-{get_generation(BOOKINGS)}'
+        return get_generation()
+
     def _is_admin(self):
         """Helper method to check if current user is admin"""
         user = self.request.user
@@ -76,7 +240,7 @@ class PropertyViewSet(viewsets.ModelViewSet):
         )
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = self.with_related(super().get_queryset())
 
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
@@ -87,6 +251,15 @@ class PropertyViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
+        # Filter by amenities: ?amenities=Pool,Gym&amenities_match=all|any
+        amenities = self.request.query_params.get('amenities')
+        if amenities:
+            queryset = filter_amenities(
+                queryset,
+                [name.strip() for name in amenities.split(',') if name.strip()],
+                match_any=self.request.query_params.get('amenities_match') == 'any'
+            )
+
         # Only show active properties to non-admin users
         # FIX: Check is_authenticated BEFORE calling is_admin_user()
         if not self._is_admin():
@@ -94,9 +267,32 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def facets(self, request):
+        """Facet counts for the current filters, from one grouped query (cached)"""
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in self.non_filter_params
+        )
+        fingerprint = json.dumps([self.generations(), self._is_admin(), params])
+        cache_key = f'property_facets_{hashlib.md5(fingerprint.encode()).hexdigest()}'
+
+        facets = cache.get(cache_key)
+        if facets is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            facets = property_facets(queryset, self.price_buckets)
+            cache.set(cache_key, facets, 600)
+        return Response(facets)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def amenities(self, request):
+        """Amenity vocabulary with active property counts"""
+        return Response(Property.get_amenity_vocabulary())
+
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
     def similar(self, request, slug=None):
-        """Get similar properties using category tree (DFS + Cache)"""
+        """Get similar properties from the k-NN similarity engine (+ Cache)"""
         try:
             property_obj = self.get_object()
 
@@ -127,6 +323,53 @@ class PropertyViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    def calendar(self, request, slug=None):
+        """Blocked dates and booked time slots in ?from=&to= (ISO dates, inclusive).
+
+        Every listed date is unavailable for new bookings, as in
+        check_availability; all_day marks bookings without a time. The ETag
+        follows this property's bookings generation, so revalidating costs
+        no booking query.
+        """
+        property_obj = self.get_object()
+        start = query_date(request, 'from', date.today())
+        end = query_date(request, 'to', start + timedelta(days=CALENDAR_DEFAULT_DAYS - 1))
+        if not 0 <= (end - start).days < CALENDAR_MAX_DAYS:
+            return Response(
+                {'error': f'to must be on or after from and at most {CALENDAR_MAX_DAYS} days later'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        etag = self.make_etag(
+            'calendar', property_obj.pk, get_generation(bookings_of(property_obj.pk)), start, end
+        )
+        response = self.not_modified(request, etag)
+        if response is not None:
+            return response
+
+        # Range scans of the (property, status, visit_date) index
+        slots = Booking.objects.filter(
+            property=property_obj,
+            status__in=Booking.BLOCKING_STATUSES,
+            visit_date__range=(start, end)
+        ).order_by('visit_date', 'visit_time').values_list('visit_date', 'visit_time')
+
+        days = {}
+        for visit_date, visit_time in slots:
+            day = days.setdefault(visit_date, {'date': visit_date, 'all_day': False, 'times': []})
+            if visit_time is None:
+                day['all_day'] = True
+            elif visit_time not in day['times']:
+                day['times'].append(visit_time)
+
+        return self.set_validators(Response({
+            'property': property_obj.slug,
+            'from': start,
+            'to': end,
+            'blocked': list(days.values()),
+        }), etag)
+
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
     def check_availability(self, request, slug=None):
         """Check property availability"""
@@ -0,0 +1,345 @@
+import io
+import json
+import random
+import time
+import uuid
+from datetime import date, datetime, time as day_time, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils.text import slugify
+from bookings.models import Booking
+from payments.models import Payment
+from properties import geo, similarity
+from properties.cache import bump_generation
+from properties.models import CATEGORY_TREE_CACHE_KEY, Category, Property, PropertyImage
+
+User = get_user_model()
+
+# Every timestamp is an offset from here, so runs do not depend on the clock
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+SPAN_SECONDS = 2 * 365 * 24 * 3600
+CENT = Decimal('0.01')
+
+CITIES = (
+    ('Malibu, California', 34.0259, -118.7798),
+    ('New York, NY', 40.7128, -74.0060),
+    ('Beverly Hills, CA', 34.0736, -118.4004),
+    ('Miami, FL', 25.7617, -80.1918),
+    ('Aspen, CO', 39.1911, -106.8175),
+    ('London, UK', 51.5072, -0.1276),
+    ('Monaco', 43.7384, 7.4246),
+    ('Dubai, UAE', 25.2048, 55.2708),
+    ('Dhaka, Bangladesh', 23.8103, 90.4125),
+    ('Sydney, Australia', -33.8688, 151.2093),
+)
+ADJECTIVES = (
+    'Luxury', 'Modern', 'Hillside', 'Beachfront', 'Historic', 'Secluded', 'Grand',
+    'Elegant', 'Lakeside', 'Panoramic', 'Contemporary', 'Private',
+)
+KINDS = (
+    'Villa', 'Penthouse', 'Estate', 'Townhouse', 'Loft', 'Chalet', 'Mansion',
+    'Residence', 'Cottage', 'Apartment',
+)
+AMENITIES = (
+    'Pool', 'Beach Access', 'Garden', 'Garage', 'Gym', 'Concierge', 'Rooftop Terrace',
+    'Tennis Court', 'Wine Cellar', 'Home Theater', 'Spa', 'Smart Home', 'Elevator',
+)
+CATEGORY_NAMES = (
+    ('Residential', 'Commercial', 'Vacation', 'Land', 'Waterfront', 'Historic', 'Industrial', 'Rural'),
+    ('Villa', 'Apartment', 'Penthouse', 'Townhouse', 'Estate', 'Loft', 'Cottage', 'Chalet'),
+)
+VISIT_TIMES = (None, day_time(10), day_time(12), day_time(14), day_time(16))
+
+USER_COLUMNS = (
+    'id', 'password', 'last_login', 'is_superuser', 'username', 'first_name', 'last_name', 'email',
+    'is_staff', 'is_active', 'date_joined', 'phone', 'user_type', 'avatar', 'created_at', 'updated_at',
+)
+CATEGORY_COLUMNS = ('id', 'name', 'slug', 'parent_id', 'description', 'tree_path', 'depth', 'created_at')
+PROPERTY_COLUMNS = (
+    'id', 'name', 'slug', 'description', 'location', 'latitude', 'longitude', 'geohash', 'category_id',
+    'price', 'bedrooms', 'bathrooms', 'square_feet', 'amenities', 'featured_image',
+    'featured_image_variants', 'status', 'model_3d_url', 'created_at', 'updated_at',
+)
+IMAGE_COLUMNS = ('property_id', 'image', 'image_variants', 'caption', 'order', 'created_at')
+BOOKING_COLUMNS = (
+    'id', 'user_id', 'property_id', 'visit_date', 'visit_time', 'base_amount', 'service_fee',
+    'tax_amount', 'total_amount', 'status', 'notes', 'created_at', 'updated_at',
+)
+PAYMENT_COLUMNS = (
+    'id', 'booking_id', 'provider', 'transaction_id', 'amount', 'currency', 'status',
+    'raw_response', 'metadata', 'created_at', 'updated_at',
+)
+
+
+def copy_text(value):
+    """One field of PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        text = 't' if value else 'f'
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    elif isinstance(value, (datetime, date, day_time)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class TableWriter:
+    """Buffer rows of one table and flush them with COPY (PostgreSQL) or executemany"""
+
+    def __init__(self, connection, model, columns, batch_size):
+        self.connection = connection
+        self.model = model
+        self.columns = columns
+        self.fields = [model._meta.get_field(column) for column in columns]
+        self.batch_size = batch_size
+        self.rows = []
+        self.written = 0
+        self.seconds = 0.0
+
+        quote = connection.ops.quote_name
+        names = ', '.join(quote(field.column) for field in self.fields)
+        table = quote(model._meta.db_table)
+        if connection.vendor == 'postgresql':
+            self.sql = f'COPY {table} ({names}) FROM STDIN'
+        else:
+            placeholders = ', '.join(['%s'] * len(columns))
+            self.sql = f'INSERT INTO {table} ({names}) VALUES ({placeholders})'
+
+    def add(self, row):
+        self.rows.append(row)
+        return len(self.rows) >= self.batch_size
+
+    def flush(self):
+        if not self.rows:
+            return
+        started = time.perf_counter()
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == 'postgresql':
+                data = ''.join('\t'.join(map(copy_text, row)) + '\n' for row in self.rows)
+                if hasattr(cursor, 'copy_expert'):
+                    cursor.copy_expert(self.sql, io.StringIO(data))
+                else:
+                    with cursor.copy(self.sql) as copy:
+                        copy.write(data)
+            else:
+                cursor.executemany(self.sql, [
+                    [field.get_db_prep_save(value, self.connection) for field, value in zip(self.fields, row)]
+                    for row in self.rows
+                ])
+        self.seconds += time.perf_counter() - started
+        self.written += len(self.rows)
+        self.rows = []
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset of any size for load and performance testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--category-depth', type=int, default=2)
+        parser.add_argument('--category-fanout', type=int, default=4,
+                            help='Children per category (and number of root categories)')
+        parser.add_argument('--properties', type=int, default=10000)
+        parser.add_argument('--images-per-property', type=int, default=3)
+        parser.add_argument('--bookings-per-property', type=int, default=2)
+        parser.add_argument('--payment-ratio', type=float, default=0.6,
+                            help='Share of bookings that have a payment (0-1)')
+        parser.add_argument('--seed', type=int, default=1,
+                            help='Same seed, same data; use another seed to add a second dataset')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        for name in ('users', 'category_depth', 'category_fanout', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be at least 1')
+        if not 0 <= options['payment_ratio'] <= 1:
+            raise CommandError('--payment-ratio must be between 0 and 1')
+
+        self.options = options
+        self.seed = options['seed']
+        self.rng = random.Random(self.seed)
+        self.connection = connections[options['database']]
+        batch_size = options['batch_size']
+        self.writers = {
+            model: TableWriter(self.connection, model, columns, batch_size)
+            for model, columns in (
+                (User, USER_COLUMNS),
+                (Category, CATEGORY_COLUMNS),
+                (Property, PROPERTY_COLUMNS),
+                (PropertyImage, IMAGE_COLUMNS),
+                (Booking, BOOKING_COLUMNS),
+                (Payment, PAYMENT_COLUMNS),
+            )
+        }
+
+        started = time.perf_counter()
+        with transaction.atomic(using=options['database']):
+            self.generate_users()
+            self.generate_categories()
+            self.generate_properties()
+            self.finish()
+        elapsed = time.perf_counter() - started
+
+        # Bulk writes send no signals, so invalidate once for the whole run;
+        # workers rebuild their similarity index lazily, before the bump
+        cache.delete(CATEGORY_TREE_CACHE_KEY)
+        similarity.publish()
+        bump_generation()
+
+        total = 0
+        for model, writer in self.writers.items():
+            total += writer.written
+            rate = writer.written / writer.seconds if writer.seconds else 0
+            self.stdout.write(f'{model._meta.db_table}: {writer.written:,} rows ({rate:,.0f} rows/s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total:,} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+    def next_id(self, model):
+        return (model.objects.using(self.options['database']).aggregate(top=Max('id'))['top'] or 0) + 1
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def moment(self):
+        return EPOCH + timedelta(seconds=self.rng.randrange(SPAN_SECONDS))
+
+    def write(self, model, row):
+        if self.writers[model].add(row):
+            self.writers[model].flush()
+
+    def generate_users(self):
+        # Hashing is the slow part of creating a user, so all share one hash
+        password = make_password('password', salt=f'generated{self.seed}')
+        first_id = self.next_id(User)
+        self.user_ids = range(first_id, first_id + self.options['users'])
+        for number, pk in enumerate(self.user_ids):
+            username = f'user{self.seed}_{number}'
+            joined = self.moment()
+            self.write(User, (
+                pk, password, None, False, username, f'First{number}', f'Last{number}',
+                f'{username}@example.com', False, True, joined, '', 'customer', None, joined, joined,
+            ))
+        self.writers[User].flush()
+
+    def generate_categories(self):
+        """Breadth-first tree, with tree_path and depth filled in as save() would"""
+        fanout, next_id = self.options['category_fanout'], self.next_id(Category)
+        level = [(None, '')]
+        for depth in range(self.options['category_depth']):
+            pool = CATEGORY_NAMES[min(depth, len(CATEGORY_NAMES) - 1)]
+            children = []
+            for parent_id, parent_path in level:
+                for position in range(fanout):
+                    name = pool[position % len(pool)]
+                    if position >= len(pool):
+                        name = f'{name} {position // len(pool) + 1}'
+                    tree_path = f'{parent_path}{next_id}/'
+                    self.write(Category, (
+                        next_id, name, f'{slugify(name)[:30]}-{self.seed}-{next_id}', parent_id,
+                        '', tree_path, depth, self.moment(),
+                    ))
+                    children.append((next_id, tree_path))
+                    next_id += 1
+            level = children
+        self.leaf_ids = [pk for pk, tree_path in level]
+        self.writers[Category].flush()
+
+    def generate_properties(self):
+        rng = self.rng
+        writer = self.writers[Property]
+        for number in range(self.options['properties']):
+            pk = self.uuid()
+            name = f'{rng.choice(ADJECTIVES)} {rng.choice(KINDS)}'
+            city, latitude, longitude = rng.choice(CITIES)
+            latitude = round(latitude + rng.uniform(-0.2, 0.2), 6)
+            longitude = round(longitude + rng.uniform(-0.2, 0.2), 6)
+            price = Decimal(rng.randrange(200, 20000)) * 1000
+            bedrooms = rng.randint(1, 10)
+            created = self.moment()
+            self.write(Property, (
+                pk, name, f'{slugify(name)}-{self.seed}-{number}',
+                f'{name} in {city} with {bedrooms} bedrooms.', city, latitude, longitude,
+                geo.encode(latitude, longitude), rng.choice(self.leaf_ids), price, bedrooms,
+                rng.randint(1, bedrooms + 2), bedrooms * rng.randint(400, 1200),
+                rng.sample(AMENITIES, rng.randint(2, 6)), None, {},
+                rng.choices(('active', 'inactive', 'sold'), (85, 5, 10))[0], None, created, created,
+            ))
+
+            for order in range(self.options['images_per_property']):
+                self.writers[PropertyImage].add((
+                    pk, f'properties/gallery/generated/{pk.hex}-{order}.jpg', {}, '', order, created,
+                ))
+            for _ in range(self.options['bookings_per_property']):
+                self.generate_booking(pk, price)
+
+            # Children are written right after their parents so foreign keys always resolve
+            if len(writer.rows) >= writer.batch_size:
+                self.flush_properties()
+                self.stdout.write(f'Properties: {writer.written:,}/{self.options["properties"]:,}')
+        self.flush_properties()
+
+    def generate_booking(self, property_id, price):
+        rng = self.rng
+        pk = self.uuid()
+        # Same arithmetic as Booking.calculate_amounts(), rounded as the columns store it
+        service_fee = price * Decimal('0.05')
+        subtotal = price + service_fee
+        tax_amount = subtotal * Decimal('0.1')
+        created = self.moment()
+        has_payment = rng.random() < self.options['payment_ratio']
+        if has_payment:
+            status = rng.choices(('paid', 'completed', 'pending', 'canceled'), (40, 30, 20, 10))[0]
+        else:
+            status = rng.choices(('pending', 'canceled'), (80, 20))[0]
+        total = (subtotal + tax_amount).quantize(CENT, ROUND_HALF_UP)
+        self.writers[Booking].add((
+            pk, rng.choice(self.user_ids), property_id,
+            (created + timedelta(days=rng.randint(1, 60))).date(), rng.choice(VISIT_TIMES),
+            price, service_fee.quantize(CENT, ROUND_HALF_UP), tax_amount.quantize(CENT, ROUND_HALF_UP),
+            total, status, '', created, created,
+        ))
+        if not has_payment:
+            return
+
+        payment_id = self.uuid()
+        provider = rng.choices(('stripe', 'bkash'), (70, 30))[0]
+        payment_status = {
+            'paid': 'success',
+            'completed': 'success',
+            'pending': rng.choice(('pending', 'processing', 'failed')),
+            'canceled': rng.choice(('refunded', 'failed')),
+        }[status]
+        if provider == 'stripe':
+            transaction_id, currency = f'pi_{payment_id.hex}', 'USD'
+        else:
+            transaction_id, currency = f'TRX{payment_id.hex.upper()}', 'BDT'
+        paid_at = created + timedelta(minutes=rng.randint(1, 120))
+        self.writers[Payment].add((
+            payment_id, pk, provider, transaction_id, total, currency, payment_status,
+            {'id': transaction_id, 'status': payment_status}, {'generated': True}, paid_at, paid_at,
+        ))
+
+    def flush_properties(self):
+        for model in (Property, PropertyImage, Booking, Payment):
+            self.writers[model].flush()
+
+    def finish(self):
+        """Sequences past the explicit ids, fresh planner statistics"""
+        if self.connection.vendor != 'postgresql':
+            return
+        with self.connection.cursor() as cursor:
+            for sql in self.connection.ops.sequence_reset_sql(no_style(), [User, Category]):
+                cursor.execute(sql)
+            for model in self.writers:
+                cursor.execute(f'ANALYZE {self.connection.ops.quote_name(model._meta.db_table)}')
@@ -33,14 +33,14 @@ class User(AbstractUser):
     
     def get_booking_history(self):
         """OOP Method: Get user's booking history"""
-        return self.bookings.select_related('property').order_by('-created_at')
+        return self.bookings.select_related('property__category', 'user').order_by('-created_at')
     
     def get_payment_history(self):
         """OOP Method: Get user's payment history"""
         from payments.models import Payment
         return Payment.objects.filter(
             booking__user=self
-        ).select_related('booking__property').order_by('-created_at')
+        ).select_related('booking__property__category', 'booking__user').order_by('-created_at')
     
     def is_admin_user(self):
         """Check if user is admin"""
@@ -1,5 +1,11 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from io import StringIO
+from bookings.models import Booking
+from payments.models import Payment
+from properties import geo
+from properties.models import Category, Property, PropertyImage
 from rest_framework.test import APITestCase
 from rest_framework import status
 
@@ -27,4 +33,53 @@ class UserAPITest(APITestCase):
         }
         response = self.client.post('/api/users/register/', data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertIn('tokens', response.data)
\ No newline at end of file
+        self.assertIn('tokens', response.data)
+
+
+class GenerateDataCommandTest(TestCase):
+    """Test the synthetic dataset generator"""
+
+    def generate(self, **options):
+        call_command(
+            'generate_data', users=5, category_depth=2, category_fanout=3, properties=20,
+            images_per_property=2, bookings_per_property=3, batch_size=7, stdout=StringIO(), **options
+        )
+
+    def snapshot(self):
+        return (
+            list(Property.objects.order_by('slug').values_list('id', 'slug', 'price', 'geohash', 'category__slug')),
+            list(Booking.objects.order_by('id').values_list('id', 'user__username', 'total_amount', 'status')),
+            list(Payment.objects.order_by('id').values_list('id', 'transaction_id', 'status')),
+        )
+
+    def test_scale_and_integrity(self):
+        self.generate(payment_ratio=1)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Category.objects.count(), 3 + 9)
+        self.assertEqual(Property.objects.count(), 20)
+        self.assertEqual(PropertyImage.objects.count(), 40)
+        self.assertEqual(Booking.objects.count(), 60)
+        self.assertEqual(Payment.objects.count(), 60)
+
+        leaf = Category.objects.filter(depth=1).first()
+        self.assertEqual(leaf.tree_path, f'{leaf.parent.tree_path}{leaf.pk}/')
+        prop = Property.objects.first()
+        self.assertEqual(prop.geohash, geo.encode(prop.latitude, prop.longitude))
+        self.assertEqual(prop.category.depth, 1)
+
+        booking = Booking.objects.select_related('property').first()
+        total = booking.total_amount
+        booking.calculate_amounts()
+        self.assertEqual(round(booking.total_amount, 2), total)
+        self.assertTrue(User.objects.first().check_password('password'))
+
+    def test_deterministic(self):
+        self.generate(seed=7)
+        first = self.snapshot()
+        for model in (Payment, Booking, PropertyImage, Property, Category, User):
+            model.objects.all().delete()
+        self.generate(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+        self.generate(seed=8)
+        self.assertEqual(Property.objects.count(), 40)